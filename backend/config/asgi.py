@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Build in-memory lookup structures before the first request
+from users import availability, revocation  # noqa: E402
+
+availability.warm()
+revocation.warm()
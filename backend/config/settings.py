@@ -91,6 +91,98 @@ else:
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
+# User.email is unique through its Lower("email") constraint, which the
+# USERNAME_FIELD check doesn't recognize
+SILENCED_SYSTEM_CHECKS = ['auth.E003']
+
+# Cache Configuration
+# The "users" cache holds User rows for authenticated requests. It defaults to
+# an in-process LRU cache; set USER_CACHE_URL to a Redis-compatible server
+# (redis://host:6379/1) to share it between workers.
+USER_CACHE_URL = config('USER_CACHE_URL', default='')
+USER_CACHE_TIMEOUT = config('USER_CACHE_TIMEOUT', default=300, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if USER_CACHE_URL:
+    CACHES['users'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': USER_CACHE_URL,
+        'TIMEOUT': USER_CACHE_TIMEOUT,
+        'KEY_PREFIX': 'users',
+    }
+else:
+    CACHES['users'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': USER_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('USER_CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    }
+
+# Rate limit counters need a shared server (RATE_LIMIT_CACHE_URL, defaulting
+# to USER_CACHE_URL); the in-process fallback counts per worker.
+RATE_LIMIT_CACHE_URL = config('RATE_LIMIT_CACHE_URL', default=USER_CACHE_URL)
+
+if RATE_LIMIT_CACHE_URL:
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': RATE_LIMIT_CACHE_URL,
+        'KEY_PREFIX': 'ratelimit',
+    }
+else:
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+
+# Password Hashers
+# PASSWORD_HASHER_TIER selects the preferred hasher (argon2, scrypt or pbkdf2).
+# Hashes made by the other tiers still verify and are upgraded to the
+# preferred tier and parameters on the next successful login. Run
+# `python manage.py calibrate_hashers` to pick parameters for this machine.
+PASSWORD_HASHER_TIER = config('PASSWORD_HASHER_TIER', default='pbkdf2')
+
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2': {
+        'iterations': config('PBKDF2_ITERATIONS', default=600000, cast=int),
+    },
+    'scrypt': {
+        'work_factor': config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int),
+        'block_size': 8,
+        'parallelism': 1,
+    },
+    'argon2': {
+        'time_cost': config('ARGON2_TIME_COST', default=2, cast=int),
+        'memory_cost': config('ARGON2_MEMORY_COST', default=102400, cast=int),  # KiB
+        'parallelism': config('ARGON2_PARALLELISM', default=8, cast=int),
+    },
+}
+
+PASSWORD_HASHER_TIERS = {
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',  # requires argon2-cffi
+    'scrypt': 'users.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_TIERS[PASSWORD_HASHER_TIER]] + [
+    hasher for tier, hasher in PASSWORD_HASHER_TIERS.items()
+    if tier != PASSWORD_HASHER_TIER
+]
+
+# Breached Passwords
+# Sorted SHA-1 prefix file built with `build_breached_passwords` from a dump
+# such as Pwned Passwords. When set it replaces the common password list;
+# it is memory-mapped, so all workers share one copy in the page cache.
+BREACHED_PASSWORDS_FILE = config('BREACHED_PASSWORDS_FILE', default='')
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -101,13 +193,24 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': (
+            'users.password_validation.BreachedPasswordValidator'
+            if BREACHED_PASSWORDS_FILE
+            else 'django.contrib.auth.password_validation.CommonPasswordValidator'
+        ),
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
 
+# Password Hashing Pool
+# Hashing runs in a pool of worker processes so it doesn't hold the GIL on
+# request threads. Set workers to 0 to opt out and hash inline. Requests
+# beyond workers + queue depth are rejected with 429 instead of queueing.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=2, cast=int)
+PASSWORD_HASHING_QUEUE_DEPTH = config('PASSWORD_HASHING_QUEUE_DEPTH', default=16, cast=int)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -118,13 +221,17 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Media files (uploaded profile pictures)
+MEDIA_URL = config('MEDIA_URL', default='/media/')
+MEDIA_ROOT = config('MEDIA_ROOT', default=os.path.join(BASE_DIR, 'media'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -135,8 +242,24 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Sliding-window limits for the login, password reset and availability throttles
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+        'login_account': config('THROTTLE_LOGIN_ACCOUNT', default='10/min'),
+        'password_reset_ip': config('THROTTLE_PASSWORD_RESET_IP', default='10/hour'),
+        'password_reset_account': config('THROTTLE_PASSWORD_RESET_ACCOUNT', default='3/hour'),
+        'availability': config('THROTTLE_AVAILABILITY', default='120/min'),
+    },
 }
 
+# Login Lockout
+# After LOGIN_LOCKOUT_THRESHOLD consecutive failed logins for an account from
+# one IP, further attempts are refused for LOGIN_LOCKOUT_BASE seconds, doubling
+# with every additional failure up to LOGIN_LOCKOUT_MAX.
+LOGIN_LOCKOUT_THRESHOLD = config('LOGIN_LOCKOUT_THRESHOLD', default=5, cast=int)
+LOGIN_LOCKOUT_BASE = config('LOGIN_LOCKOUT_BASE', default=30, cast=int)  # seconds
+LOGIN_LOCKOUT_MAX = config('LOGIN_LOCKOUT_MAX', default=3600, cast=int)  # seconds
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
@@ -149,10 +272,103 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('users.tokens.UserAccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# JWT Signing Keys
+# With JWT_KEYS_DIR set, tokens are signed with the private key
+# <JWT_KEYS_DIR>/<JWT_SIGNING_KEY_ID>.pem (EdDSA for Ed25519 keys, RS256 for
+# RSA keys) and carry a `kid` header. Other keys in the directory are retired:
+# they still verify and stay published at /api/auth/.well-known/jwks.json.
+# Without it tokens are signed HS256 with SECRET_KEY as before.
+JWT_KEYS_DIR = config('JWT_KEYS_DIR', default='')
+JWT_SIGNING_KEY_ID = config('JWT_SIGNING_KEY_ID', default='')
+# Keep accepting kid-less HS256 tokens until they have all expired
+JWT_ACCEPT_LEGACY_TOKENS = config('JWT_ACCEPT_LEGACY_TOKENS', default=True, cast=bool)
+JWKS_MAX_AGE = config('JWKS_MAX_AGE', default=300, cast=int)  # seconds
+
+# Access Token Cache
+# Access tokens that passed signature and claim validation are kept in a
+# per-process LRU until they expire, so repeat requests skip decoding (0 = off).
+ACCESS_TOKEN_CACHE_SIZE = config('ACCESS_TOKEN_CACHE_SIZE', default=10000, cast=int)
+
+# Token Introspection
+# Resource servers authenticate to /api/auth/introspect/ with HTTP Basic
+# credentials listed as client_id:secret pairs, comma-separated.
+INTROSPECTION_CLIENTS = dict(
+    client.strip().split(':', 1)
+    for client in config('INTROSPECTION_CLIENTS', default='').split(',')
+    if client.strip()
+)
+INTROSPECTION_MAX_BATCH = config('INTROSPECTION_MAX_BATCH', default=100, cast=int)
+INTROSPECTION_MAX_AGE = config('INTROSPECTION_MAX_AGE', default=30, cast=int)  # seconds
+
+# Login Bookkeeping
+# When enabled, last_login/last_login_ip writes are buffered per process and
+# flushed in batches instead of issuing one UPDATE per login.
+LOGIN_WRITE_BUFFER_ENABLED = config('LOGIN_WRITE_BUFFER_ENABLED', default=False, cast=bool)
+LOGIN_WRITE_BUFFER_SIZE = config('LOGIN_WRITE_BUFFER_SIZE', default=100, cast=int)
+LOGIN_WRITE_BUFFER_INTERVAL = config('LOGIN_WRITE_BUFFER_INTERVAL', default=5.0, cast=float)  # seconds
+
+# Refresh Token Rotation
+# Each refresh token can be exchanged once. Reusing it again within the grace
+# window (parallel refreshes from several tabs) still succeeds; any later
+# reuse revokes every token of that login session.
+REFRESH_TOKEN_REUSE_GRACE = config('REFRESH_TOKEN_REUSE_GRACE', default=10, cast=int)  # seconds
+
+# Token Revocation Filter
+# A per-process Bloom filter of revoked refresh token IDs answers "not revoked"
+# without a query; only filter hits are checked against the database. Size
+# CAPACITY above the number of live revocations (see `revocation_filter_stats`).
+REVOCATION_FILTER_ENABLED = config('REVOCATION_FILTER_ENABLED', default=True, cast=bool)
+REVOCATION_FILTER_CAPACITY = config('REVOCATION_FILTER_CAPACITY', default=100000, cast=int)
+REVOCATION_FILTER_ERROR_RATE = config('REVOCATION_FILTER_ERROR_RATE', default=0.001, cast=float)
+REVOCATION_FILTER_SYNC_INTERVAL = config('REVOCATION_FILTER_SYNC_INTERVAL', default=1.0, cast=float)  # seconds
+REVOCATION_FILTER_REBUILD_INTERVAL = config('REVOCATION_FILTER_REBUILD_INTERVAL', default=3600, cast=int)  # seconds
+
+# Availability Filter
+# GET /api/auth/availability/ answers from a per-process Bloom filter of
+# existing emails and usernames and only queries on filter hits. CAPACITY is
+# counted in keys (two per user); the filter grows on rebuild when exceeded.
+AVAILABILITY_FILTER_ENABLED = config('AVAILABILITY_FILTER_ENABLED', default=True, cast=bool)
+AVAILABILITY_FILTER_CAPACITY = config('AVAILABILITY_FILTER_CAPACITY', default=1000000, cast=int)
+AVAILABILITY_FILTER_ERROR_RATE = config('AVAILABILITY_FILTER_ERROR_RATE', default=0.01, cast=float)
+AVAILABILITY_FILTER_SYNC_INTERVAL = config('AVAILABILITY_FILTER_SYNC_INTERVAL', default=5.0, cast=float)  # seconds
+AVAILABILITY_FILTER_REBUILD_INTERVAL = config('AVAILABILITY_FILTER_REBUILD_INTERVAL', default=3600, cast=int)  # seconds
+
+# Trusted Proxies
+# Load balancers and reverse proxies (IPs or CIDRs, comma-separated) whose
+# X-Forwarded-For entries are believed. The client IP is the first untrusted
+# hop walking X-Forwarded-For from the right; with none configured the
+# connecting address is used and X-Forwarded-For is ignored.
+TRUSTED_PROXIES = [
+    proxy.strip() for proxy in config('TRUSTED_PROXIES', default='').split(',')
+    if proxy.strip()
+]
+
+# Admin
+# User changelist counts use the PostgreSQL planner estimate once it reaches
+# this many rows; smaller results are counted exactly.
+ADMIN_EXACT_COUNT_THRESHOLD = config('ADMIN_EXACT_COUNT_THRESHOLD', default=100000, cast=int)
+
+# Bulk admin actions on users update this many rows per transaction. Larger
+# selections are queued and applied by the run_admin_jobs command.
+ADMIN_JOB_CHUNK_SIZE = config('ADMIN_JOB_CHUNK_SIZE', default=1000, cast=int)
+
+# Profile Pictures
+# Uploads over the size limit are refused while they stream in. Accepted
+# pictures are stored once per content hash and square WebP thumbnails of
+# each size are generated by the process_profile_pictures command.
+PROFILE_PICTURE_MAX_SIZE = config('PROFILE_PICTURE_MAX_SIZE', default=5 * 1024 * 1024, cast=int)  # bytes
+PROFILE_PICTURE_MAX_PIXELS = config('PROFILE_PICTURE_MAX_PIXELS', default=40000000, cast=int)
+PROFILE_PICTURE_SIZES = tuple(
+    int(size)
+    for size in config('PROFILE_PICTURE_SIZES', default='64,256').split(',')
+    if size.strip()
+)
+PROFILE_PICTURE_WEBP_QUALITY = config('PROFILE_PICTURE_WEBP_QUALITY', default=80, cast=int)
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     origin.strip() for origin in config('CORS_ALLOWED_ORIGINS', default='http://localhost:5173').split(',')
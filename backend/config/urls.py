@@ -25,15 +25,26 @@ def api_root(request):
         'endpoints': {
             'auth': {
                 'register': '/api/auth/register/',
+                'availability': '/api/auth/availability/',
                 'login': '/api/auth/login/',
                 'logout': '/api/auth/logout/',
                 'refresh': '/api/auth/refresh/',
+                'introspect': '/api/auth/introspect/',
                 'profile': '/api/auth/profile/',
                 'change-password': '/api/auth/change-password/',
+                'users': '/api/auth/users/',
                 'forgot-password': '/api/auth/forgot-password/',
                 'reset-password': '/api/auth/reset-password/',
+                'jwks': '/api/auth/.well-known/jwks.json',
                 'health': '/api/auth/health/',
             },
+            'auth_async': {
+                'login': '/api/async/auth/login/',
+                'logout': '/api/async/auth/logout/',
+                'refresh': '/api/async/auth/refresh/',
+                'profile': '/api/async/auth/profile/',
+                'health': '/api/async/auth/health/',
+            },
             'documentation': {
                 'swagger': '/api/docs/',
                 'redoc': '/api/redoc/',
@@ -55,6 +66,9 @@ urlpatterns = [
     # Authentication endpoints
     path('api/auth/', include('users.urls')),
     
+    # Native async authentication endpoints (serve with ASGI)
+    path('api/async/auth/', include('users.async_urls')),
+    
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
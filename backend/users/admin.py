@@ -2,10 +2,92 @@
 Django Admin Configuration for User Management
 Professional admin interface with search, filters, and actions
 """
-from django.contrib import admin
+from datetime import datetime
+
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import (
+    ERROR_FLAG,
+    IGNORED_PARAMS,
+    ORDER_VAR,
+    PAGE_VAR,
+    SEARCH_VAR,
+    ChangeList,
+)
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import User
+from . import cache, jobs
+from .models import AdminJob, EmailOutbox, ProfilePicture, User
+from .pagination import EstimatedCountPaginator, keyset_filter
+
+CURSOR_VAR = 'after'
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist paginated by (created_at, pk) keyset in the default ordering,
+    so every page is an index range scan instead of an ever larger OFFSET.
+    Sorting by a column falls back to numbered pages.
+    """
+    keyset_ordering = ['-created_at', '-pk']
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        self.keyset = (
+            ORDER_VAR not in self.params
+            and not self.show_all
+            and list(dict.fromkeys(self.queryset.query.order_by)) == self.keyset_ordering
+        )
+        if not self.keyset:
+            self.cursor = None
+            super().get_results(request)
+            self.result_count_is_estimate = self.paginator.is_estimate
+            return
+
+        queryset = self.queryset
+        if self.cursor:
+            created_at, pk = self.parse_cursor(self.cursor)
+            queryset = keyset_filter(queryset, created_at, pk)
+        results = list(queryset[:self.list_per_page + 1])
+
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        self.result_count = self.paginator.count
+        self.result_count_is_estimate = self.paginator.is_estimate
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = results[:self.list_per_page]
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor) or len(results) > self.list_per_page
+
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR])
+        self.next_page_url = None
+        if len(results) > self.list_per_page:
+            last = self.result_list[-1]
+            self.next_page_url = self.get_query_string(
+                {CURSOR_VAR: f'{last.created_at.isoformat()}|{last.pk}'},
+                remove=[PAGE_VAR]
+            )
+
+    @staticmethod
+    def parse_cursor(cursor):
+        try:
+            created_at, pk = cursor.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError as e:
+            raise IncorrectLookupParameters(e)
 
 
 @admin.register(User)
@@ -36,20 +118,24 @@ class UserAdmin(BaseUserAdmin):
         'last_login',
     )
     
-    search_fields = (
-        'email',
-        'username',
-        'first_name',
-        'last_name',
-    )
+    # Prefix matches can use the pattern indexes; substring matches can't.
+    # Queued bulk actions re-run the same search (see jobs.SEARCH_FIELDS).
+    search_fields = tuple(f'^{field}' for field in jobs.SEARCH_FIELDS)
     
     ordering = ('-created_at',)
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
+    # Pictures go through the upload pipeline (content hash, thumbnails),
+    # which an admin file upload would bypass
     readonly_fields = (
+        'profile_picture',
         'created_at',
         'updated_at',
         'last_login',
         'last_login_ip',
+        'token_epoch',
         'age',
     )
     
@@ -88,6 +174,7 @@ class UserAdmin(BaseUserAdmin):
             'fields': (
                 'last_login',
                 'last_login_ip',
+                'token_epoch',
                 'created_at',
                 'updated_at',
             ),
@@ -117,10 +204,14 @@ class UserAdmin(BaseUserAdmin):
         'make_unverified',
         'make_active',
         'make_inactive',
+        'revoke_sessions',
         'promote_to_admin',
         'demote_to_user',
     ]
     
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
     def colored_status(self, obj):
         """Display colored status based on user state"""
         if obj.is_active and obj.is_verified:
@@ -145,57 +236,241 @@ class UserAdmin(BaseUserAdmin):
         return obj.get_full_name()
     get_full_name.short_description = 'Full Name'
     
+    def _run_job(self, request, queryset, action, verb):
+        """
+        Apply a bulk action right away when the selection fits in one chunk,
+        otherwise queue it as a chunked background job
+        """
+        try:
+            job = jobs.enqueue(action, self.get_selection(request, queryset), created_by=request.user)
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
+        if job.status == AdminJob.Status.DONE:
+            self.message_user(
+                request,
+                f'{job.processed} user(s) successfully {verb}.'
+            )
+        else:
+            self.message_user(
+                request,
+                format_html(
+                    'About {} user(s) will be {} in the background. '
+                    '<a href="{}">Track progress</a>.',
+                    job.total,
+                    verb,
+                    reverse('admin:users_adminjob_change', args=[job.pk])
+                )
+            )
+
+    def get_selection(self, request, queryset):
+        """
+        Job selection for an action: the checked users' IDs, or the
+        changelist filters and search when every matching user is selected
+        """
+        if request.POST.get('select_across') != '1':
+            return {'pks': list(queryset.values_list('pk', flat=True))}
+
+        ignored = {*IGNORED_PARAMS, PAGE_VAR, ERROR_FLAG, CURSOR_VAR}
+        return {
+            'filters': {
+                key: value for key, value in request.GET.items()
+                if key not in ignored
+            },
+            'search': request.GET.get(SEARCH_VAR, ''),
+        }
+
+    def delete_queryset(self, request, queryset):
+        """Bulk delete users and drop their cached rows"""
+        user_ids = list(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        cache.invalidate(*user_ids)
+
     # Admin Actions
     def make_verified(self, request, queryset):
         """Mark selected users as verified"""
-        updated = queryset.update(is_verified=True)
-        self.message_user(
-            request,
-            f'{updated} user(s) successfully marked as verified.'
-        )
+        self._run_job(request, queryset, 'make_verified', 'marked as verified')
     make_verified.short_description = 'Mark selected users as verified'
     
     def make_unverified(self, request, queryset):
         """Mark selected users as unverified"""
-        updated = queryset.update(is_verified=False)
-        self.message_user(
-            request,
-            f'{updated} user(s) successfully marked as unverified.'
-        )
+        self._run_job(request, queryset, 'make_unverified', 'marked as unverified')
     make_unverified.short_description = 'Mark selected users as unverified'
     
     def make_active(self, request, queryset):
         """Activate selected users"""
-        updated = queryset.update(is_active=True)
-        self.message_user(
-            request,
-            f'{updated} user(s) successfully activated.'
-        )
+        self._run_job(request, queryset, 'make_active', 'activated')
     make_active.short_description = 'Activate selected users'
     
     def make_inactive(self, request, queryset):
-        """Deactivate selected users"""
-        updated = queryset.update(is_active=False)
-        self.message_user(
-            request,
-            f'{updated} user(s) successfully deactivated.'
-        )
+        """Deactivate selected users and invalidate their tokens"""
+        self._run_job(request, queryset, 'make_inactive', 'deactivated')
     make_inactive.short_description = 'Deactivate selected users'
     
+    def revoke_sessions(self, request, queryset):
+        """Invalidate every token issued to the selected users"""
+        self._run_job(request, queryset, 'revoke_sessions', 'signed out of all sessions')
+    revoke_sessions.short_description = 'Sign out selected users everywhere'
+    
     def promote_to_admin(self, request, queryset):
         """Promote selected users to admin role"""
-        updated = queryset.update(role=User.Role.ADMIN)
-        self.message_user(
-            request,
-            f'{updated} user(s) successfully promoted to admin.'
-        )
+        self._run_job(request, queryset, 'promote_to_admin', 'promoted to admin')
     promote_to_admin.short_description = 'Promote selected users to admin'
     
     def demote_to_user(self, request, queryset):
         """Demote selected users to regular user role"""
-        updated = queryset.update(role=User.Role.USER)
+        self._run_job(request, queryset, 'demote_to_user', 'demoted to user')
+    demote_to_user.short_description = 'Demote selected users to regular user'
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """
+    Outbox monitoring with manual retry
+    """
+    list_display = (
+        'to_email',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+        'created_at',
+    )
+
+    list_filter = (
+        'status',
+    )
+
+    search_fields = (
+        'to_email',
+    )
+
+    readonly_fields = (
+        'attempts',
+        'last_error',
+        'created_at',
+        'sent_at',
+    )
+
+    actions = [
+        'retry_now',
+    ]
+
+    def retry_now(self, request, queryset):
+        """Requeue selected emails for immediate delivery"""
+        updated = queryset.exclude(status=EmailOutbox.Status.SENT).update(
+            status=EmailOutbox.Status.PENDING,
+            next_attempt_at=timezone.now()
+        )
+        self.message_user(
+            request,
+            f'{updated} email(s) queued for immediate delivery.'
+        )
+    retry_now.short_description = 'Retry selected emails now'
+
+
+@admin.register(AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    """
+    Progress of queued bulk user actions
+    """
+    list_display = (
+        'action',
+        'status',
+        'progress',
+        'created_by',
+        'created_at',
+        'finished_at',
+    )
+
+    list_filter = (
+        'status',
+        'action',
+    )
+
+    readonly_fields = (
+        'action',
+        'selection',
+        'status',
+        'progress',
+        'total',
+        'processed',
+        'last_pk',
+        'created_by',
+        'leased_until',
+        'last_error',
+        'created_at',
+        'finished_at',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        """Processed users against the (possibly estimated) selection size"""
+        if obj.status == AdminJob.Status.DONE or not obj.total:
+            percent = 100 if obj.status == AdminJob.Status.DONE else 0
+        else:
+            percent = min(100 * obj.processed // obj.total, 99)
+        return format_html(
+            '<progress value="{}" max="100"></progress> {}% ({} user(s))',
+            percent,
+            percent,
+            obj.processed
+        )
+    progress.short_description = 'Progress'
+
+
+@admin.register(ProfilePicture)
+class ProfilePictureAdmin(admin.ModelAdmin):
+    """
+    Thumbnail generation status of uploaded profile pictures, with retry
+    """
+    list_display = (
+        'digest',
+        'status',
+        'attempts',
+        'created_at',
+        'processed_at',
+    )
+
+    list_filter = (
+        'status',
+    )
+
+    search_fields = (
+        '=digest',
+    )
+
+    readonly_fields = (
+        'digest',
+        'original',
+        'thumbnails',
+        'status',
+        'attempts',
+        'leased_until',
+        'last_error',
+        'created_at',
+        'processed_at',
+    )
+
+    actions = [
+        'retry_now',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_now(self, request, queryset):
+        """Requeue selected pictures for thumbnail generation"""
+        updated = queryset.exclude(status=ProfilePicture.Status.READY).update(
+            status=ProfilePicture.Status.PENDING,
+            attempts=0,
+            leased_until=None
+        )
         self.message_user(
             request,
-            f'{updated} user(s) successfully demoted to user.'
+            f'{updated} picture(s) queued for thumbnail generation.'
         )
-    demote_to_user.short_description = 'Demote selected users to regular user'
\ No newline at end of file
+    retry_now.short_description = 'Retry selected pictures now'
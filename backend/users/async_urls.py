@@ -0,0 +1,20 @@
+"""
+URL Configuration for the async (ASGI) authentication endpoints
+"""
+from django.urls import path
+from . import async_views
+
+app_name = 'users_async'
+
+urlpatterns = [
+    # Authentication endpoints
+    path('login/', async_views.AsyncUserLoginView.as_view(), name='login'),
+    path('logout/', async_views.AsyncUserLogoutView.as_view(), name='logout'),
+    path('refresh/', async_views.AsyncTokenRefreshView.as_view(), name='token_refresh'),
+
+    # Profile management
+    path('profile/', async_views.AsyncUserProfileView.as_view(), name='profile'),
+
+    # Health check
+    path('health/', async_views.AsyncHealthCheckView.as_view(), name='health_check'),
+]
@@ -0,0 +1,284 @@
+"""
+Async Authentication API Views
+Native async (ASGI) versions of the login, refresh, logout, profile and
+health endpoints, built on Django's async ORM
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    NotFound,
+    ParseError,
+    Throttled,
+    ValidationError,
+)
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import cache
+from .authentication import StatelessJWTAuthentication, aload_user
+from .hashing import hashing_service
+from .models import User
+from .serializers import (
+    UserCredentialsSerializer,
+    UserProfileSerializer,
+    UserTokenRefreshSerializer
+)
+from .throttling import LOGIN_THROTTLES, lockout, lockout_ident
+from .tokens import UserRefreshToken
+from .utils import get_client_ip, profile_preconditions, set_profile_validators
+
+logger = logging.getLogger(__name__)
+
+
+def invalid_credentials():
+    return ValidationError({
+        api_settings.NON_FIELD_ERRORS_KEY: ["Invalid email or password."]
+    })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base class for async JSON endpoints
+    Mirrors DRF's authentication, throttling and error response format
+    """
+    authentication_required = False
+    throttle_classes = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.authentication_required:
+                result = await StatelessJWTAuthentication().aauthenticate(request)
+                if result is None:
+                    raise NotAuthenticated()
+                request.user, request.auth = result
+
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            if isinstance(exc.detail, (list, dict)):
+                data = exc.detail
+            else:
+                data = {'detail': exc.detail}
+            response = JsonResponse(data, status=exc.status_code, safe=False)
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = '%d' % exc.wait
+            return response
+
+    def parse_json(self, request):
+        """Decode a JSON request body"""
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise ParseError(f"JSON parse error - {e}")
+        if not isinstance(data, dict):
+            raise ParseError("Expected a JSON object.")
+        # Throttles read submitted fields from request.data, as on DRF requests
+        request.data = data
+        return data
+
+    def check_throttles(self, request):
+        """Raise Throttled if any throttle rejects the request"""
+        waits = [
+            throttle.wait()
+            for throttle in (throttle_class() for throttle_class in self.throttle_classes)
+            if not throttle.allow_request(request, self)
+        ]
+        if waits:
+            raise Throttled(wait=max(waits))
+
+    async def acheck_throttles(self, request):
+        await sync_to_async(self.check_throttles, thread_sensitive=False)(request)
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    """
+    User Login API (async)
+    Authenticates user and returns JWT tokens
+    """
+    throttle_classes = LOGIN_THROTTLES
+
+    async def post(self, request):
+        data = self.parse_json(request)
+        await self.acheck_throttles(request)
+        lockout_key = lockout_ident(request)
+
+        serializer = UserCredentialsSerializer(data=data)
+        if not serializer.is_valid():
+            await self.record_failure(lockout_key)
+            raise ValidationError(serializer.errors)
+
+        email = serializer.validated_data['email'].lower()
+        password = serializer.validated_data['password']
+
+        user = await User.objects.filter(email__lower=email).afirst()
+        if user is None:
+            # Hash anyway so response time doesn't reveal unknown emails
+            await hashing_service.amake_password(password)
+            await self.record_failure(lockout_key)
+            raise invalid_credentials()
+
+        # Hashing runs in the hashing pool, off the event loop
+        valid = await user.acheck_password(password)
+        if not valid or not user.is_active:
+            await self.record_failure(lockout_key)
+            raise invalid_credentials()
+
+        if lockout_key:
+            await sync_to_async(lockout.reset, thread_sensitive=False)(lockout_key)
+
+        refresh = UserRefreshToken.for_user(user)
+        access_token = refresh.access_token
+
+        await user.arecord_login(get_client_ip(request))
+
+        logger.info(f"User logged in: {user.email}")
+
+        return JsonResponse({
+            'message': 'Login successful',
+            'user': {
+                'id': user.id,
+                'email': user.email,
+                'username': user.username,
+                'full_name': user.get_full_name(),
+                'role': user.role,
+                'is_verified': user.is_verified,
+            },
+            'tokens': {
+                'access': str(access_token),
+                'refresh': str(refresh),
+            }
+        }, status=status.HTTP_200_OK)
+
+    async def record_failure(self, lockout_key):
+        if lockout_key:
+            await sync_to_async(lockout.record_failure, thread_sensitive=False)(lockout_key)
+
+
+class AsyncTokenRefreshView(AsyncAPIView):
+    """
+    JWT Token Refresh API (async)
+    """
+    async def post(self, request):
+        raw_token = self.parse_json(request).get('refresh')
+        if not raw_token:
+            raise ValidationError({'refresh': ["This field is required."]})
+
+        try:
+            refresh = UserRefreshToken(raw_token, check_revoked=False)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        user = await cache.aget_user(refresh[jwt_settings.USER_ID_CLAIM])
+        UserTokenRefreshSerializer.check_user(user, refresh)
+
+        try:
+            if jwt_settings.ROTATE_REFRESH_TOKENS and jwt_settings.BLACKLIST_AFTER_ROTATION:
+                await refresh.arotate()
+            else:
+                await refresh.acheck_blacklist()
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        data = UserTokenRefreshSerializer.issue_tokens(refresh, user)
+
+        logger.info("JWT token refreshed successfully")
+
+        return JsonResponse(data, status=status.HTTP_200_OK)
+
+
+class AsyncUserLogoutView(AsyncAPIView):
+    """
+    User Logout API (async)
+    Blacklists the refresh token
+    """
+    authentication_required = True
+
+    async def post(self, request):
+        try:
+            refresh_token = self.parse_json(request).get("refresh_token")
+            if refresh_token:
+                token = UserRefreshToken(refresh_token, check_revoked=False)
+                await token.acheck_blacklist()
+                await token.ablacklist()
+
+            logger.info(f"User logged out: {request.user.email}")
+
+            return JsonResponse({
+                'message': 'Logout successful'
+            }, status=status.HTTP_200_OK)
+        except Exception:
+            return JsonResponse({
+                'error': 'Invalid token'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncUserProfileView(AsyncAPIView):
+    """
+    User Profile API (async)
+    Get and update user profile information (JSON bodies only)
+    """
+    authentication_required = True
+
+    async def get(self, request):
+        user = await aload_user(request.user.pk)
+        response = profile_preconditions(request, user)
+        if response is None:
+            serializer = UserProfileSerializer(user, context={'request': request})
+            response = JsonResponse(serializer.data, status=status.HTTP_200_OK)
+        return set_profile_validators(response, user)
+
+    async def put(self, request):
+        return await self.update(request, partial=False)
+
+    async def patch(self, request):
+        return await self.update(request, partial=True)
+
+    async def update(self, request, partial):
+        # Preconditions are checked against the row rather than the cache.
+        # The async ORM has no transactions, so unlike the sync view the
+        # check and the write are not atomic.
+        user = await User.objects.filter(pk=request.user.pk).afirst()
+        if user is None:
+            raise NotFound()
+        response = profile_preconditions(request, user)
+        if response is not None:
+            return response
+
+        serializer = UserProfileSerializer(
+            user,
+            data=self.parse_json(request),
+            partial=partial,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        update_fields = serializer.set_changed_fields(
+            user,
+            {**serializer.validated_data, **serializer.store_picture()}
+        )
+        if update_fields:
+            await user.asave(update_fields=update_fields)
+
+        response = JsonResponse(serializer.data, status=status.HTTP_200_OK)
+        return set_profile_validators(response, user)
+
+
+class AsyncHealthCheckView(AsyncAPIView):
+    """
+    Simple health check endpoint (async)
+    """
+    async def get(self, request):
+        return JsonResponse({
+            'status': 'healthy',
+            'message': 'JWT Auth API is running'
+        }, status=status.HTTP_200_OK)
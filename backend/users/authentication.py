@@ -0,0 +1,218 @@
+"""
+Stateless JWT Authentication
+Authenticates requests from token claims and defers the User lookup
+until a view actually needs the database row, plus client credentials for
+resource servers calling token introspection
+"""
+import base64
+import binascii
+import hmac
+from functools import partial
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache
+from .models import User
+from .token_cache import verified_tokens
+from .tokens import USER_CLAIMS, token_epoch
+
+
+def load_user(user_id):
+    """Fetch the full User row behind a token through the user cache"""
+    user = cache.get_user(user_id)
+    if user is None:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    return user
+
+
+async def aload_user(user_id):
+    """Async variant of load_user"""
+    user = await cache.aget_user(user_id)
+    if user is None:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    return user
+
+
+class TokenClaim:
+    """
+    Attribute answered from a token claim until the User row is loaded
+    """
+    def __init__(self, claim):
+        self.claim = claim
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if instance._wrapped is not empty:
+            return getattr(instance._wrapped, self.claim)
+        return instance.__dict__['token'][self.claim]
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    Lightweight user built from the claims of a validated token.
+    Role and status checks are served from the token; any other attribute
+    loads the full User row on first access and proxies to it.
+    """
+    email = TokenClaim('email')
+    role = TokenClaim('role')
+    is_active = TokenClaim('is_active')
+    is_verified = TokenClaim('is_verified')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        super().__init__(partial(load_user, user_id))
+        self.__dict__['token'] = validated_token
+        self.__dict__['user_id'] = user_id
+
+    def __bool__(self):
+        # Permission checks test truthiness before anything else
+        return True
+
+    @property
+    def pk(self):
+        return self.__dict__['user_id']
+
+    id = pk
+
+    @property
+    def is_admin(self):
+        """Check if user has admin role"""
+        return self.role == User.Role.ADMIN
+
+    @property
+    def is_moderator(self):
+        """Check if user has moderator role"""
+        return self.role == User.Role.MODERATOR
+
+    @property
+    def is_loaded(self):
+        """Whether the User row has been fetched"""
+        return self._wrapped is not empty
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips the per-request User lookup.
+    Validated tokens are cached until they expire, and each request only
+    checks the user's cached token epoch. Tokens issued before user claims
+    were embedded fall back to a cached User lookup.
+    """
+    token_cache = verified_tokens
+
+    def get_validated_token(self, raw_token):
+        """Validate the token, reusing the result for tokens seen before"""
+        return self.token_cache.get_or_validate(raw_token, super().get_validated_token)
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+
+        if self.has_user_claims(validated_token):
+            self.check_epoch(validated_token, cache.get_token_epoch(user_id))
+            return self.get_token_user(validated_token)
+
+        user = self.check_active(load_user(user_id))
+        self.check_epoch(validated_token, user.token_epoch)
+        return user
+
+    async def aauthenticate(self, request):
+        """Async variant of authenticate for native async views"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Async variant of get_user"""
+        user_id = self.get_user_id(validated_token)
+
+        if self.has_user_claims(validated_token):
+            self.check_epoch(validated_token, await cache.aget_token_epoch(user_id))
+            return self.get_token_user(validated_token)
+
+        user = self.check_active(await aload_user(user_id))
+        self.check_epoch(validated_token, user.token_epoch)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def has_user_claims(self, validated_token):
+        return all(claim in validated_token for claim in USER_CLAIMS)
+
+    def get_token_user(self, validated_token):
+        if not validated_token['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return TokenUser(validated_token)
+
+    def check_epoch(self, validated_token, epoch):
+        """Reject tokens issued before the user's last mass revocation"""
+        if epoch is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if token_epoch(validated_token) != epoch:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+    def check_active(self, user):
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class IntrospectionClient:
+    """
+    Resource server authenticated with introspection client credentials
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+
+    def __str__(self):
+        return self.client_id
+
+
+class IntrospectionClientAuthentication(BaseAuthentication):
+    """
+    HTTP Basic client authentication against INTROSPECTION_CLIENTS
+    (RFC 7662 section 2.1)
+    """
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != b'basic':
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid basic header.", code="invalid_client")
+
+        try:
+            credentials = base64.b64decode(auth[1], validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            raise AuthenticationFailed("Invalid basic header.", code="invalid_client")
+
+        client_id, _, secret = credentials.partition(':')
+        expected = settings.INTROSPECTION_CLIENTS.get(client_id)
+        if expected is None or not hmac.compare_digest(secret.encode(), expected.encode()):
+            raise AuthenticationFailed("Invalid client credentials.", code="invalid_client")
+
+        return IntrospectionClient(client_id), None
+
+    def authenticate_header(self, request):
+        return 'Basic realm="introspection"'
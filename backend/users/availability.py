@@ -0,0 +1,96 @@
+"""
+Username and Email Availability
+Answers "is this taken?" from a per-process Bloom filter of existing
+emails and usernames, querying the unique indexes only on filter hits
+"""
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .bloom import SyncedBloomFilter
+from .models import User
+from .pagination import count_rows
+
+logger = logging.getLogger(__name__)
+
+EMAIL = 'email'
+USERNAME = 'username'
+
+
+def _key(field, value):
+    return f'{field}:{value.lower()}'
+
+
+class AvailabilityFilter(SyncedBloomFilter):
+    """
+    Bloom filter of lowercased emails and usernames of existing users.
+    Users saved by this process are added on save; users created or renamed
+    elsewhere are picked up by the next sync (on updated_at). Old names and
+    deleted users stay in the filter until the next rebuild, which only
+    costs a query.
+    """
+    name = 'Availability filter'
+
+    def get_capacity(self):
+        return settings.AVAILABILITY_FILTER_CAPACITY
+
+    def get_error_rate(self):
+        return settings.AVAILABILITY_FILTER_ERROR_RATE
+
+    def get_sync_interval(self):
+        return settings.AVAILABILITY_FILTER_SYNC_INTERVAL
+
+    def get_rebuild_interval(self):
+        return settings.AVAILABILITY_FILTER_REBUILD_INTERVAL
+
+    def _keys(self, rows):
+        for email, username in rows:
+            yield _key(EMAIL, email)
+            yield _key(USERNAME, username)
+
+    def load_keys(self, now):
+        count, _ = count_rows(User.objects.all())
+        rows = User.objects.values_list(EMAIL, USERNAME).iterator(chunk_size=10000)
+        return 2 * count, self._keys(rows)
+
+    def load_keys_since(self, since):
+        rows = User.objects.filter(updated_at__gte=since).values_list(EMAIL, USERNAME)
+        return self._keys(rows)
+
+    def add_user(self, user):
+        self.add(_key(EMAIL, user.email))
+        self.add(_key(USERNAME, user.username))
+
+
+availability_filter = AvailabilityFilter()
+
+
+def is_taken(field, value):
+    """Whether a user with this email or username exists"""
+    if field == EMAIL:
+        value = value.lower()
+
+    if settings.AVAILABILITY_FILTER_ENABLED:
+        if availability_filter.needs_refresh():
+            availability_filter.refresh()
+        if not availability_filter.might_contain(_key(field, value)):
+            return False
+
+    # Served from the unique index alone
+    if field == EMAIL:
+        field = 'email__lower'
+    return User.objects.filter(**{field: value}).values('pk').exists()
+
+
+def warm():
+    """
+    Build the filter at server start instead of on the first request.
+    Without a usable database it is built on first use instead.
+    """
+    if not settings.AVAILABILITY_FILTER_ENABLED:
+        return
+    try:
+        availability_filter.refresh()
+    except DatabaseError as e:
+        logger.warning("Availability filter not built at startup: %s", e)
@@ -0,0 +1,189 @@
+"""
+Bloom Filter
+Compact probabilistic set used to skip database lookups for keys that are
+definitely absent
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-capacity Bloom filter over strings.
+    Membership tests never give false negatives; false positives occur at
+    roughly `error_rate` once `capacity` distinct items have been added.
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        """
+        Add an item. Items already in the filter (the overlapping window of
+        every incremental sync, mostly) are not counted again, so `count`
+        tracks distinct items and rebuilds happen when the filter is full.
+        """
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def estimated_error_rate(self):
+        """Expected false-positive rate at the current fill"""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    @property
+    def size_bytes(self):
+        return len(self.bits)
+
+
+class SyncedBloomFilter:
+    """
+    Per-process Bloom filter mirroring keys stored in the database.
+    Built on first use, topped up with keys written since the last sync every
+    sync interval, and rebuilt every rebuild interval (or when full) to drop
+    keys that are gone. Keys written by another process may be missed for up
+    to one sync interval. Subclasses supply the keys and sizing.
+    """
+    name = 'Bloom filter'
+
+    # Overlap between incremental syncs, covering rows whose transaction
+    # committed after a later-stamped row was already seen
+    sync_overlap = timedelta(seconds=5)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self.reset_stats()
+
+    def get_capacity(self):
+        raise NotImplementedError
+
+    def get_error_rate(self):
+        raise NotImplementedError
+
+    def get_sync_interval(self):
+        raise NotImplementedError
+
+    def get_rebuild_interval(self):
+        raise NotImplementedError
+
+    def load_keys(self, now):
+        """(number of keys, iterable of every live key) as of `now`"""
+        raise NotImplementedError
+
+    def load_keys_since(self, since):
+        """Keys written at or after `since`"""
+        raise NotImplementedError
+
+    def reset_stats(self):
+        self.checks = 0
+        self.hits = 0
+        self.rebuilds = 0
+        self.last_rebuild_seconds = None
+
+    def needs_refresh(self):
+        return time.monotonic() >= self._next_sync
+
+    def refresh(self):
+        """Rebuild or incrementally sync the filter if it is due"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            bloom = self._bloom
+            if bloom is None or now >= self._next_rebuild or len(bloom) >= bloom.capacity:
+                self._rebuild()
+            else:
+                self._sync()
+            self._next_sync = time.monotonic() + self.get_sync_interval()
+
+    def _rebuild(self):
+        started = time.perf_counter()
+        synced_at = timezone.now()
+        count, keys = self.load_keys(synced_at)
+
+        bloom = BloomFilter(max(self.get_capacity(), 2 * count), self.get_error_rate())
+        for key in keys:
+            bloom.add(key)
+
+        self._bloom = bloom
+        self._synced_at = synced_at
+        self._next_rebuild = time.monotonic() + self.get_rebuild_interval()
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - started
+
+        logger.info(
+            "%s rebuilt: %d keys, %d bytes, %.1f ms; %s",
+            self.name, len(bloom), bloom.size_bytes, self.last_rebuild_seconds * 1000,
+            self.stats()
+        )
+
+    def _sync(self):
+        synced_at = timezone.now()
+        for key in self.load_keys_since(self._synced_at - self.sync_overlap):
+            self.add(key)
+        self._synced_at = synced_at
+
+    def add(self, key):
+        if self._bloom is not None:
+            self._bloom.add(key)
+
+    def might_contain(self, key):
+        """False means the key is definitely not stored"""
+        self.checks += 1
+        if self._bloom is None or key in self._bloom:
+            self.hits += 1
+            return True
+        return False
+
+    def stats(self):
+        bloom = self._bloom
+        return {
+            'entries': len(bloom) if bloom is not None else 0,
+            'capacity': bloom.capacity if bloom is not None else 0,
+            'size_bytes': bloom.size_bytes if bloom is not None else 0,
+            'estimated_error_rate': bloom.estimated_error_rate if bloom is not None else None,
+            'checks': self.checks,
+            'hits': self.hits,
+            'rebuilds': self.rebuilds,
+            'last_rebuild_seconds': self.last_rebuild_seconds,
+        }
@@ -0,0 +1,257 @@
+"""
+Bulk User Import/Export
+Streams users to and from CSV or JSON Lines and creates them in batches,
+hashing plaintext passwords across a process pool
+"""
+import csv
+import json
+import sys
+from contextlib import nullcontext
+from itertools import islice
+
+from django.contrib.auth import hashers
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .hashing import create_pool
+from .models import User
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = (CSV, JSONL)
+
+# Columns read on import and written on export
+FIELDS = (
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'phone',
+    'date_of_birth',
+    'bio',
+    'role',
+    'is_active',
+    'is_verified',
+)
+
+# Optional import columns: a plaintext password to hash, or an already
+# encoded hash (as exported). Rows with neither get an unusable password and
+# set one through the password reset flow on first login.
+PASSWORD = 'password'
+PASSWORD_HASH = 'password_hash'
+
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'f', 'no', 'n', '')
+
+
+def guess_format(path):
+    return JSONL if path.endswith(('.jsonl', '.ndjson')) else CSV
+
+
+def open_input(path):
+    """Open an import file; - reads stdin, which is left open"""
+    if path == '-':
+        return nullcontext(sys.stdin)
+    return open(path, encoding='utf-8', newline='')
+
+
+def open_output(path, stdout):
+    """Open an export file; - writes to the command's stdout"""
+    if path == '-':
+        return nullcontext(stdout)
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict) from a CSV or JSON Lines stream"""
+    if fmt == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError("Expected a JSON object")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError(f"Invalid boolean: {value!r}")
+
+
+def _describe(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(
+            f"{field}: {' '.join(messages)}"
+            for field, messages in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+
+def build_user(row):
+    """
+    Build an unsaved User from an import row, validating field values.
+    Uniqueness is checked per batch, not here. Returns (user, plaintext
+    password or None).
+    """
+    values = {}
+    for name in FIELDS:
+        value = row.get(name)
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if name in ('is_active', 'is_verified'):
+            value = _to_bool(value)
+        values[name] = value
+
+    if 'email' in values:
+        values['email'] = User.objects.normalize_email(values['email']).lower()
+
+    user = User(**values)
+    user.clean_fields(exclude=['password', 'last_login', 'last_login_ip'])
+
+    password = row.get(PASSWORD) or None
+    encoded = row.get(PASSWORD_HASH) or None
+    if encoded and encoded.startswith(hashers.UNUSABLE_PASSWORD_PREFIX):
+        user.set_unusable_password()
+    elif encoded:
+        try:
+            hashers.identify_hasher(encoded)
+        except ValueError:
+            raise ValidationError({PASSWORD_HASH: "Unknown password hash format."})
+        user.password = encoded
+    elif not password:
+        user.set_unusable_password()
+
+    return user, password
+
+
+class UserImporter:
+    """
+    Validates rows in batches, skips users whose email or username already
+    exists and inserts the rest with one bulk_create per batch. Plaintext
+    passwords are hashed on `workers` processes (0 = inline).
+    """
+    def __init__(self, batch_size=1000, workers=0, dry_run=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers:
+            self._pool = create_pool(self.workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def hash_passwords(self, passwords):
+        if self._pool is None:
+            return [hashers.make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._pool.map(hashers.make_password, passwords, chunksize=chunksize))
+
+    def import_rows(self, rows):
+        """Import (line number, row) pairs; yields after each batch"""
+        for batch in chunked(rows, self.batch_size):
+            self.import_batch(batch)
+            yield
+
+    def import_batch(self, batch):
+        candidates = []
+        for line_number, row in batch:
+            if isinstance(row, Exception):
+                self.errors.append((line_number, str(row)))
+                continue
+            try:
+                user, password = build_user(row)
+            except ValidationError as e:
+                self.errors.append((line_number, _describe(e)))
+                continue
+            candidates.append((user, password))
+
+        # One query per unique field for the whole batch
+        emails = {user.email for user, _ in candidates}
+        usernames = {user.username for user, _ in candidates}
+        taken_emails = set(
+            User.objects.filter(email__lower__in=emails).values_list('email', flat=True)
+        )
+        taken_usernames = set(
+            User.objects.filter(username__in=usernames).values_list('username', flat=True)
+        )
+
+        users = []
+        to_hash = []
+        for user, password in candidates:
+            if user.email in taken_emails or user.username in taken_usernames:
+                self.skipped += 1
+                continue
+            # Duplicates within the batch keep their first occurrence
+            taken_emails.add(user.email)
+            taken_usernames.add(user.username)
+            users.append(user)
+            if password:
+                to_hash.append((user, password))
+
+        if to_hash and not self.dry_run:
+            encoded = self.hash_passwords([password for _, password in to_hash])
+            for (user, _), password_hash in zip(to_hash, encoded):
+                user.password = password_hash
+
+        if users and not self.dry_run:
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.created += len(users)
+
+
+def export_rows(queryset, include_password_hashes=False, chunk_size=2000):
+    """Stream export rows without loading the queryset into memory"""
+    fields = FIELDS + (('password',) if include_password_hashes else ())
+    for row in queryset.order_by('pk').values(*fields).iterator(chunk_size=chunk_size):
+        if include_password_hashes:
+            row[PASSWORD_HASH] = row.pop('password')
+        yield row
+
+
+class RowWriter:
+    """Writes export rows as CSV or JSON Lines"""
+    def __init__(self, stream, fmt, include_password_hashes=False):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == CSV:
+            fieldnames = FIELDS + ((PASSWORD_HASH,) if include_password_hashes else ())
+            self._writer = csv.DictWriter(stream, fieldnames=fieldnames)
+            self._writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == CSV:
+            self._writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
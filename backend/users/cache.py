@@ -0,0 +1,120 @@
+"""
+User Row Cache
+Read-through cache of User rows and token epochs keyed by id, backed by the
+"users" cache alias (in-process LRU by default, Redis-compatible server when
+configured)
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+USER_CACHE_ALIAS = 'users'
+
+
+def _cache():
+    return caches[USER_CACHE_ALIAS]
+
+
+def _key(user_id):
+    return f'user:{user_id}'
+
+
+def _epoch_key(user_id):
+    return f'epoch:{user_id}'
+
+
+def get_user(user_id):
+    """Return the User with the given id, or None if it does not exist"""
+    cache = _cache()
+    key = _key(user_id)
+
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user)
+    return user
+
+
+async def aget_user(user_id):
+    """Async variant of get_user"""
+    cache = _cache()
+    key = _key(user_id)
+
+    user = await cache.aget(key)
+    if user is None:
+        user = await get_user_model().objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await cache.aset(key, user)
+    return user
+
+
+def get_users(user_ids):
+    """Return {id: User} for the given ids with one cache round trip"""
+    cache = _cache()
+    keys = {_key(user_id): user_id for user_id in user_ids}
+
+    users = {keys[key]: user for key, user in cache.get_many(keys).items()}
+    missing = [user_id for user_id in keys.values() if user_id not in users]
+    if missing:
+        fetched = get_user_model().objects.in_bulk(missing)
+        cache.set_many({_key(pk): user for pk, user in fetched.items()})
+        users.update(fetched)
+    return users
+
+
+def get_token_epoch(user_id):
+    """Return the user's token epoch, or None if the user does not exist"""
+    cache = _cache()
+    key = _epoch_key(user_id)
+
+    epoch = cache.get(key)
+    if epoch is None:
+        epoch = get_user_model().objects.filter(pk=user_id).values_list(
+            'token_epoch', flat=True
+        ).first()
+        if epoch is not None:
+            cache.set(key, epoch)
+    return epoch
+
+
+async def aget_token_epoch(user_id):
+    """Async variant of get_token_epoch"""
+    cache = _cache()
+    key = _epoch_key(user_id)
+
+    epoch = await cache.aget(key)
+    if epoch is None:
+        epoch = await get_user_model().objects.filter(pk=user_id).values_list(
+            'token_epoch', flat=True
+        ).afirst()
+        if epoch is not None:
+            await cache.aset(key, epoch)
+    return epoch
+
+
+def _keys(user_ids):
+    return [key for user_id in user_ids for key in (_key(user_id), _epoch_key(user_id))]
+
+
+def invalidate(*user_ids):
+    """
+    Drop cached rows and token epochs for the given users.
+    Inside a transaction the rows are dropped again on commit so a
+    concurrent reader cannot re-cache the pre-commit state.
+    """
+    keys = _keys(user_ids)
+    if not keys:
+        return
+
+    cache = _cache()
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+async def ainvalidate(*user_ids):
+    """Async variant of invalidate (async code never runs inside atomic())"""
+    keys = _keys(user_ids)
+    if keys:
+        await _cache().adelete_many(keys)
@@ -0,0 +1,65 @@
+"""
+Tunable Password Hashers
+Django's Argon2, scrypt and PBKDF2 hashers with cost parameters taken from
+PASSWORD_HASHER_PARAMS, so they can be calibrated per deployment
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def hasher_param(tier, name):
+    return settings.PASSWORD_HASHER_PARAMS[tier][name]
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with a configurable iteration count
+    """
+    @property
+    def iterations(self):
+        return hasher_param('pbkdf2', 'iterations')
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt with a configurable work factor
+    """
+    @property
+    def work_factor(self):
+        return hasher_param('scrypt', 'work_factor')
+
+    @property
+    def block_size(self):
+        return hasher_param('scrypt', 'block_size')
+
+    @property
+    def parallelism(self):
+        return hasher_param('scrypt', 'parallelism')
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuses to use more than 32 MiB unless told otherwise;
+        # leave headroom for hashes made with a higher previous work factor
+        needed = 128 * self.work_factor * self.block_size * self.parallelism
+        return max(2 * needed, 64 * 1024 * 1024)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with configurable time and memory cost (requires argon2-cffi)
+    """
+    @property
+    def time_cost(self):
+        return hasher_param('argon2', 'time_cost')
+
+    @property
+    def memory_cost(self):
+        return hasher_param('argon2', 'memory_cost')
+
+    @property
+    def parallelism(self):
+        return hasher_param('argon2', 'parallelism')
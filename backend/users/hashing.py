@@ -0,0 +1,133 @@
+"""
+Password Hashing Service
+Runs password hashing in a bounded process pool so slow hashers don't hold
+the GIL on request threads
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingServiceBusy(APIException):
+    """Raised when the hashing pool queue is full"""
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = 'Server is busy, please try again shortly.'
+    default_code = 'hashing_busy'
+
+
+def _init_worker():
+    """Configure Django in a freshly spawned worker process"""
+    import django
+    django.setup()
+
+
+def create_pool(workers):
+    """Process pool whose workers have Django configured for hashing"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def _verify(password, encoded):
+    """Return (is_correct, must_update) for a password and its stored hash"""
+    outdated = []
+    is_correct = hashers.check_password(
+        password,
+        encoded,
+        setter=lambda raw_password: outdated.append(True)
+    )
+    return is_correct, bool(outdated)
+
+
+class HashingService:
+    """
+    Bounded process pool for password hashing.
+    At most `workers + queue depth` hashes are in flight per process; any
+    request beyond that is rejected immediately instead of queueing behind
+    seconds of CPU work. With zero workers hashing runs inline.
+    """
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return settings.PASSWORD_HASHING_WORKERS
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = create_pool(self.workers)
+                self._slots = threading.BoundedSemaphore(
+                    self.workers + settings.PASSWORD_HASHING_QUEUE_DEPTH
+                )
+            return self._executor
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingServiceBusy()
+
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self.shutdown()
+            raise
+
+        future.add_done_callback(lambda f: slots.release())
+        return future
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        try:
+            return self._submit(fn, *args).result()
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+
+    async def arun(self, fn, *args):
+        if not self.workers:
+            return await sync_to_async(fn, thread_sensitive=False)(*args)
+        try:
+            return await asyncio.wrap_future(self._submit(fn, *args))
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+
+    def make_password(self, password):
+        """Hash a password with the preferred hasher"""
+        return self.run(hashers.make_password, password)
+
+    async def amake_password(self, password):
+        return await self.arun(hashers.make_password, password)
+
+    def check_password(self, password, encoded):
+        """Return (is_correct, must_update) for a password and its hash"""
+        return self.run(_verify, password, encoded)
+
+    async def acheck_password(self, password, encoded):
+        return await self.arun(_verify, password, encoded)
+
+    def shutdown(self):
+        """Stop the pool; it is recreated on next use"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+hashing_service = HashingService()
@@ -0,0 +1,93 @@
+"""
+Token Introspection
+RFC 7662-style answers on whether tokens are active, resolved through the
+verified token, revocation and user caches
+"""
+import time
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache
+from .token_cache import verified_tokens
+from .tokens import USER_CLAIMS, UserAccessToken, UserRefreshToken, token_epoch
+
+ACCESS_TOKEN = 'access_token'
+REFRESH_TOKEN = 'refresh_token'
+TOKEN_TYPE_HINTS = (ACCESS_TOKEN, REFRESH_TOKEN)
+
+
+def _decode_access(raw_token):
+    return verified_tokens.get_or_validate(raw_token.encode(), UserAccessToken)
+
+
+def _decode(raw_token, token_type_hint=None):
+    """Validate a token of either type, hinted type first; None if invalid"""
+    decoders = [(ACCESS_TOKEN, _decode_access), (REFRESH_TOKEN, UserRefreshToken)]
+    if token_type_hint == REFRESH_TOKEN:
+        decoders.reverse()
+
+    for token_type, decode in decoders:
+        try:
+            return token_type, decode(raw_token)
+        except TokenError:
+            continue
+    return None, None
+
+
+def _is_active(token, user):
+    """Apply the same checks authentication and refresh would"""
+    return (
+        user is not None
+        and user.is_active
+        and token.get('is_active', True)
+        and token_epoch(token) == user.token_epoch
+    )
+
+
+def _describe(token_type, token, user):
+    user_id = token[api_settings.USER_ID_CLAIM]
+    result = {
+        'active': True,
+        'token_type': token_type,
+        'sub': str(user_id),
+        'user_id': user_id,
+        'jti': token.get(api_settings.JTI_CLAIM),
+        'iat': token.get('iat'),
+        'exp': token['exp'],
+    }
+    # Report what our own views authorize against: the token's claims,
+    # or the user row for tokens issued before claims were embedded
+    for claim in USER_CLAIMS:
+        if claim != 'token_epoch':
+            result[claim] = token[claim] if claim in token else getattr(user, claim)
+    return result
+
+
+def introspect(raw_tokens, token_type_hint=None):
+    """
+    Return one introspection result per token, in order, and the number of
+    seconds the results may be cached for
+    """
+    decoded = [_decode(raw_token, token_type_hint) for raw_token in raw_tokens]
+    users = cache.get_users({
+        token[api_settings.USER_ID_CLAIM]
+        for _, token in decoded
+        if token is not None and api_settings.USER_ID_CLAIM in token
+    })
+
+    now = time.time()
+    results = []
+    max_age = None
+    for token_type, token in decoded:
+        user = users.get(token.get(api_settings.USER_ID_CLAIM)) if token is not None else None
+        if token is None or not _is_active(token, user):
+            # Inactive tokens never become active again
+            results.append({'active': False})
+            continue
+
+        results.append(_describe(token_type, token, user))
+        remaining = max(int(token['exp'] - now), 0)
+        max_age = remaining if max_age is None else min(max_age, remaining)
+
+    return results, max_age
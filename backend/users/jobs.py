@@ -0,0 +1,174 @@
+"""
+Chunked Admin Jobs
+Applies bulk admin actions to users in short primary-key ordered
+transactions, invalidating cached users and tokens after every chunk
+"""
+import time
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import smart_split, unescape_string_literal
+
+from . import cache
+from .models import AdminJob, User
+from .pagination import count_rows
+
+
+def _bump_epoch():
+    return F('token_epoch') + 1
+
+
+# Bulk actions by name: the field updates each one applies. Actions taking
+# away what a token claim grants bump the epoch so issued tokens stop
+# carrying it; granting actions reach new access tokens on refresh.
+ACTIONS = {
+    'make_verified': lambda: {'is_verified': True},
+    'make_unverified': lambda: {'is_verified': False, 'token_epoch': _bump_epoch()},
+    'make_active': lambda: {'is_active': True},
+    'make_inactive': lambda: {'is_active': False, 'token_epoch': _bump_epoch()},
+    'revoke_sessions': lambda: {'token_epoch': _bump_epoch()},
+    'promote_to_admin': lambda: {'role': User.Role.ADMIN},
+    'demote_to_user': lambda: {'role': User.Role.USER, 'token_epoch': _bump_epoch()},
+}
+
+# Changelist filters a stored selection may use, with their allowed lookups
+FILTER_LOOKUPS = {
+    'role': ('exact',),
+    'is_verified': ('exact',),
+    'is_active': ('exact',),
+    'is_staff': ('exact',),
+    'is_superuser': ('exact',),
+    'created_at': ('gte', 'lt'),
+    'last_login': ('gte', 'lt', 'isnull'),
+}
+
+# Fields matched by prefix search (the admin's '^' search fields)
+SEARCH_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+# Seconds an inline run holds its job against run_admin_jobs workers
+INLINE_LEASE = 300
+
+
+def selection_queryset(selection):
+    """
+    Users chosen by a stored selection: either explicit primary keys
+    ({'pks': [...]}) or changelist filters and search terms ({'filters':
+    {...}, 'search': '...'}). Raises ValueError for anything else.
+    """
+    queryset = User.objects.all()
+    if 'pks' in selection:
+        return queryset.filter(pk__in=[int(pk) for pk in selection['pks']])
+    if 'filters' not in selection:
+        raise ValueError("Admin job has no stored selection")
+
+    lookups = {}
+    for key, value in selection['filters'].items():
+        field, _, lookup = key.partition('__')
+        if lookup not in FILTER_LOOKUPS.get(field, ()):
+            raise ValueError(f"Unsupported admin job filter: {key}")
+        if lookup == 'isnull':
+            value = value in ('1', 'True', 'true')
+        lookups[key] = value
+    queryset = queryset.filter(**lookups)
+
+    # Same term splitting as the admin's search
+    for term in smart_split(selection.get('search', '')):
+        if term.startswith(('"', "'")) and term[0] == term[-1]:
+            term = unescape_string_literal(term)
+        queryset = queryset.filter(reduce(or_, (
+            Q(**{f'{field}__istartswith': term}) for field in SEARCH_FIELDS
+        )))
+    return queryset
+
+
+def enqueue(action, selection, created_by=None):
+    """
+    Queue `action` for the users chosen by `selection` (see
+    selection_queryset). Selections that fit in one chunk are applied right
+    away; returns the job either way.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown admin job action: {action}")
+
+    queryset = selection_queryset(selection)
+    job = AdminJob(
+        action=action,
+        selection=selection,
+        created_by=created_by
+    )
+
+    chunk_size = settings.ADMIN_JOB_CHUNK_SIZE
+    inline = len(queryset.values_list('pk', flat=True)[:chunk_size + 1]) <= chunk_size
+    if inline:
+        job.total = queryset.count()
+        # Leased from the start so workers don't claim it as well
+        job.leased_until = timezone.now() + timedelta(seconds=INLINE_LEASE)
+    else:
+        job.total, _ = count_rows(queryset)
+    job.save()
+
+    if inline:
+        run(job, lease=INLINE_LEASE)
+    return job
+
+
+def run_chunk(job, chunk_size):
+    """
+    Apply the job's action to the selected users in the next primary-key
+    range after job.last_pk, in one short transaction. Returns False once no
+    users are left.
+    """
+    fields = ACTIONS[job.action]()
+    remaining = selection_queryset(job.selection).filter(pk__gt=job.last_pk).order_by('pk')
+
+    with transaction.atomic():
+        user_ids = list(remaining.values_list('pk', flat=True)[:chunk_size])
+        if not user_ids:
+            return False
+        updated = User.objects.filter(pk__in=user_ids).update(**fields)
+
+        job.processed += updated
+        job.last_pk = user_ids[-1]
+        AdminJob.objects.filter(pk=job.pk).update(
+            processed=job.processed,
+            last_pk=job.last_pk
+        )
+
+    # Cached rows and token epochs of this chunk are stale from here on
+    cache.invalidate(*user_ids)
+    return len(user_ids) == chunk_size
+
+
+def run(job, chunk_size=None, pause=0.0, lease=None):
+    """
+    Run a job to completion, recording failures on the job. When `lease` is
+    given it is renewed after every chunk so other workers leave the job alone.
+    """
+    chunk_size = chunk_size or settings.ADMIN_JOB_CHUNK_SIZE
+    AdminJob.objects.filter(pk=job.pk).update(status=AdminJob.Status.RUNNING)
+    job.status = AdminJob.Status.RUNNING
+
+    try:
+        while run_chunk(job, chunk_size):
+            if lease:
+                AdminJob.objects.filter(pk=job.pk).update(
+                    leased_until=timezone.now() + timedelta(seconds=lease)
+                )
+            if pause:
+                time.sleep(pause)
+    except Exception as e:
+        job.status = AdminJob.Status.FAILED
+        job.last_error = str(e)
+        job.save(update_fields=['status', 'last_error'])
+        raise
+
+    job.status = AdminJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.leased_until = None
+    job.save(update_fields=['status', 'finished_at', 'leased_until'])
+    return job
@@ -0,0 +1,199 @@
+"""
+JWT Signing Keyring
+Asymmetric signing keys loaded once per process: the active key signs new
+tokens with a `kid` header, retired keys still verify, and all public keys
+are published as a JWKS document
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+LEGACY_ALGORITHM = 'HS256'
+
+
+def _algorithm_for(key):
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'RS256'
+    raise ImproperlyConfigured(f"Unsupported JWT signing key type: {type(key).__name__}")
+
+
+class SigningKey:
+    """
+    Parsed key pair identified by its kid.
+    Retired keys may be configured with only the public half.
+    """
+    def __init__(self, kid, key):
+        self.kid = kid
+        self.algorithm = _algorithm_for(key)
+        if hasattr(key, 'public_key'):
+            self.private_key, self.public_key = key, key.public_key()
+        else:
+            self.private_key, self.public_key = None, key
+
+    @classmethod
+    def from_pem(cls, kid, data):
+        from cryptography.hazmat.primitives import serialization
+
+        try:
+            key = serialization.load_pem_private_key(data, password=None)
+        except ValueError:
+            key = serialization.load_pem_public_key(data)
+        return cls(kid, key)
+
+    def to_jwk(self):
+        jwk = jwt.get_algorithm_by_name(self.algorithm).to_jwk(self.public_key, as_dict=True)
+        jwk.update(kid=self.kid, alg=self.algorithm, use='sig')
+        return jwk
+
+
+class Keyring:
+    """
+    Set of signing keys with one active key.
+    The JWKS document and its ETag are rendered once when the keyring loads.
+    """
+    def __init__(self, keys=(), active_kid=None):
+        self.keys = {key.kid: key for key in keys}
+        self.active = None
+
+        if self.keys:
+            self.active = self.keys.get(active_kid)
+            if self.active is None or self.active.private_key is None:
+                raise ImproperlyConfigured(
+                    f"JWT_SIGNING_KEY_ID must name a private key in JWT_KEYS_DIR (got {active_kid!r})"
+                )
+
+        self.jwks = json.dumps(
+            {'keys': [key.to_jwk() for key in self.keys.values()]},
+            separators=(',', ':'),
+            sort_keys=True
+        ).encode()
+        self.etag = hashlib.sha256(self.jwks).hexdigest()[:32]
+
+    @classmethod
+    def from_directory(cls, path, active_kid):
+        """Load <kid>.pem files; every key but the active one is retired"""
+        keys = [
+            SigningKey.from_pem(pem.stem, pem.read_bytes())
+            for pem in sorted(Path(path).glob('*.pem'))
+        ]
+        return cls(keys, active_kid)
+
+    def get(self, kid):
+        return self.keys.get(kid)
+
+
+class KeyringTokenBackend(TokenBackend):
+    """
+    Token backend signing with the keyring's active key.
+    Tokens are verified with the key named by their `kid` header; tokens
+    without one are checked as legacy HS256 tokens when those are accepted.
+    Without any keys configured it behaves like the default HS256 backend.
+    """
+    def __init__(self, keyring):
+        super().__init__(
+            LEGACY_ALGORITHM,
+            api_settings.SIGNING_KEY,
+            audience=api_settings.AUDIENCE,
+            issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+        self.keyring = keyring
+
+    def encode(self, payload):
+        active = self.keyring.active
+        if active is None:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            active.private_key,
+            algorithm=active.algorithm,
+            headers={'kid': active.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+        if kid is None:
+            if self.keyring.active is not None and not settings.JWT_ACCEPT_LEGACY_TOKENS:
+                raise TokenBackendError(_("Token is invalid or expired"))
+            return super().decode(token, verify=verify)
+
+        key = self.keyring.get(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid or expired"))
+
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_token_backend():
+    """Process-wide token backend, loading the keyring on first use"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                keyring = Keyring()
+                if settings.JWT_KEYS_DIR:
+                    keyring = Keyring.from_directory(
+                        settings.JWT_KEYS_DIR,
+                        settings.JWT_SIGNING_KEY_ID
+                    )
+                _backend = KeyringTokenBackend(keyring)
+    return _backend
+
+
+def get_keyring():
+    return get_token_backend().keyring
+
+
+def reset(**kwargs):
+    """Drop the loaded keyring so it is re-read on next use"""
+    global _backend
+    if kwargs.get('setting') in (None, 'JWT_KEYS_DIR', 'JWT_SIGNING_KEY_ID', 'SIMPLE_JWT'):
+        _backend = None
+
+
+setting_changed.connect(reset)
@@ -0,0 +1,89 @@
+"""
+Login Bookkeeping Buffer
+Collects last_login/last_login_ip writes and flushes them in batches
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+
+class LoginWriteBuffer:
+    """
+    Per-process buffer of pending login writes.
+    Repeated logins by the same user collapse into one entry. The buffer is
+    flushed with a single bulk UPDATE once it holds `batch_size` users, when
+    `flush_interval` seconds have passed since the first pending entry, or
+    when the process exits.
+    """
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def batch_size(self):
+        return settings.LOGIN_WRITE_BUFFER_SIZE
+
+    @property
+    def flush_interval(self):
+        return settings.LOGIN_WRITE_BUFFER_INTERVAL
+
+    def add(self, user_id, last_login, ip_address):
+        """Queue a login write, flushing if the batch is full"""
+        with self._lock:
+            self._pending[user_id] = (last_login, ip_address)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write all pending logins in one UPDATE, returning the row count"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return 0
+
+        User = get_user_model()
+        users = [
+            User(pk=user_id, last_login=last_login, last_login_ip=ip_address)
+            for user_id, (last_login, ip_address) in pending.items()
+        ]
+        started = time.monotonic()
+        updated = User.objects.bulk_update(users, ['last_login', 'last_login_ip'])
+        cache.invalidate(*pending)
+
+        logger.debug(
+            f"Flushed {updated} login write(s) in {time.monotonic() - started:.3f}s"
+        )
+        return updated
+
+    def _timed_flush(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush buffered login writes")
+        finally:
+            # The timer thread owns its own connection
+            connection.close()
+
+
+login_buffer = LoginWriteBuffer()
+atexit.register(login_buffer.flush)
@@ -0,0 +1,176 @@
+"""
+WSGI vs ASGI Benchmark
+Drives the sync DRF endpoints through the WSGI handler and the native async
+endpoints through the ASGI handler with the same concurrent workload
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.throttling import SimpleRateThrottle
+
+from users.models import User
+from users.tokens import UserRefreshToken
+
+ENDPOINTS = ('health', 'profile', 'refresh', 'login')
+
+BENCH_EMAIL = 'benchmark@example.com'
+BENCH_PASSWORD = 'Benchmark-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the WSGI (sync DRF) auth endpoints with their native async "
+        "versions under the same concurrency. Runs against a throwaway test "
+        "database with throttling disabled; use PostgreSQL for representative "
+        "numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help="Requests per endpoint and mode"
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help="Requests in flight (WSGI threads / ASGI tasks)"
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=ENDPOINTS,
+            default=list(ENDPOINTS),
+            help="Endpoints to benchmark"
+        )
+
+    def handle(self, *args, **options):
+        # Every request logs in or refreshes as one account from one IP, so
+        # the login throttles would answer most of them with 429. Rates are
+        # read at import, hence the patch rather than a settings override.
+        with mock.patch.object(
+            SimpleRateThrottle,
+            'THROTTLE_RATES',
+            dict.fromkeys(SimpleRateThrottle.THROTTLE_RATES)
+        ):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        setup_test_environment()
+        if connection.vendor == 'sqlite':
+            # Shared-cache in-memory SQLite locks whole tables under
+            # concurrent writers; a file database waits on its busy timeout
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.mkdtemp(), 'benchmark.sqlite3'
+            )
+        old_name = connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False
+        )
+
+        try:
+            user = User.objects.create_user(
+                email=BENCH_EMAIL,
+                username='benchmark',
+                password=BENCH_PASSWORD,
+                first_name='Bench',
+                last_name='Mark'
+            )
+            self.user = user
+            self.access = str(UserRefreshToken.for_user(user).access_token)
+
+            self.stdout.write(
+                f"{'endpoint':<10} {'mode':<5} {'req/s':>9} "
+                f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            )
+            for endpoint in options['endpoints']:
+                for mode in ('wsgi', 'asgi'):
+                    self.report(endpoint, mode, *self.run(endpoint, mode, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def request_args(self, endpoint, prefix, index):
+        """Method, path and keyword arguments for the index-th request"""
+        if endpoint == 'health':
+            return 'get', f'{prefix}/health/', {}
+        if endpoint == 'profile':
+            return 'get', f'{prefix}/profile/', {
+                'headers': {'Authorization': f'Bearer {self.access}'},
+            }
+        if endpoint == 'refresh':
+            return 'post', f'{prefix}/refresh/', {
+                'data': {'refresh': self.refresh_tokens[index]},
+                'content_type': 'application/json',
+            }
+        return 'post', f'{prefix}/login/', {
+            'data': {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD},
+            'content_type': 'application/json',
+        }
+
+    def run(self, endpoint, mode, options):
+        if endpoint == 'refresh':
+            # Rotation revokes a refresh token on first use, so reusing one
+            # would measure the reuse/grace path instead of a normal refresh
+            self.refresh_tokens = [
+                str(UserRefreshToken.for_user(self.user))
+                for _ in range(options['requests'])
+            ]
+        if mode == 'wsgi':
+            return self.run_wsgi(endpoint, options)
+        return asyncio.run(self.run_asgi(endpoint, options))
+
+    def run_wsgi(self, endpoint, options):
+        def one(index):
+            method, path, kwargs = self.request_args(endpoint, '/api/auth', index)
+            client = Client()
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            elapsed = time.perf_counter() - started
+            connection.close()
+            return elapsed, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(one, range(options['requests'])))
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, endpoint, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def one(index):
+            method, path, kwargs = self.request_args(endpoint, '/api/async/auth', index)
+            async with semaphore:
+                started = time.perf_counter()
+                response = await getattr(client, method)(path, **kwargs)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(index) for index in range(options['requests'])))
+        return results, time.perf_counter() - started
+
+    def report(self, endpoint, mode, results, total):
+        latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+        errors = sum(1 for _, code in results if code >= 400)
+        quantiles = statistics.quantiles(latencies, n=100)
+
+        line = (
+            f"{endpoint:<10} {mode:<5} {len(results) / total:>9.1f} "
+            f"{quantiles[49]:>8.1f} {quantiles[94]:>8.1f} {quantiles[98]:>8.1f}"
+        )
+        if errors:
+            line += f"  ({errors} errors)"
+        self.stdout.write(line)
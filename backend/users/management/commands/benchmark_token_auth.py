@@ -0,0 +1,112 @@
+"""
+Token Authentication Microbenchmark
+Measures per-request JWT authentication overhead with and without the
+verified access token cache
+"""
+import io
+import statistics
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIRequestFactory
+
+from users.authentication import StatelessJWTAuthentication
+from users.models import User
+from users.token_cache import VerifiedTokenCache
+from users.tokens import UserRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Time StatelessJWTAuthentication.authenticate() for one request with "
+        "the verified token cache disabled and enabled. Runs against a "
+        "throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help="Authentications per measurement"
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help="Measurements per mode (the median is reported)"
+        )
+        parser.add_argument(
+            '--algorithm',
+            choices=('HS256', 'EdDSA', 'RS256'),
+            default='HS256',
+            help="Signing algorithm (EdDSA/RS256 use a temporary key)"
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False
+        )
+
+        try:
+            if options['algorithm'] == 'HS256':
+                self.run(options)
+            else:
+                with tempfile.TemporaryDirectory() as keys_dir:
+                    call_command(
+                        'generate_signing_key',
+                        kid='benchmark',
+                        algorithm=options['algorithm'],
+                        dir=keys_dir,
+                        stdout=io.StringIO()
+                    )
+                    with override_settings(JWT_KEYS_DIR=keys_dir, JWT_SIGNING_KEY_ID='benchmark'):
+                        self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run(self, options):
+        user = User.objects.create_user(
+            email='benchmark@example.com',
+            username='benchmark',
+            password=None,
+            first_name='Bench',
+            last_name='Mark'
+        )
+        access = str(UserRefreshToken.for_user(user).access_token)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        self.stdout.write(
+            f"{options['algorithm']}, {options['iterations']} authentications "
+            f"x {options['repeat']} runs"
+        )
+
+        results = {}
+        for mode, size in (('uncached', 0), ('cached', 1024)):
+            authenticator = StatelessJWTAuthentication()
+            authenticator.token_cache = VerifiedTokenCache(size)
+            # Warm the token and user epoch caches
+            authenticator.authenticate(request)
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                for _ in range(options['iterations']):
+                    authenticator.authenticate(request)
+                timings.append((time.perf_counter() - started) / options['iterations'])
+
+            results[mode] = statistics.median(timings)
+            self.stdout.write(f"{mode:<10} {results[mode] * 1e6:>8.1f} us/request")
+
+        self.stdout.write(
+            f"Speedup:   {results['uncached'] / results['cached']:>8.1f}x"
+        )
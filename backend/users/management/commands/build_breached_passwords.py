@@ -0,0 +1,177 @@
+"""
+Breached Password Corpus Builder
+Turns a breached-password dump into the sorted, fixed-width SHA-1 prefix
+file searched by BreachedPasswordValidator
+"""
+import gzip
+import heapq
+import os
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.password_validation import DEFAULT_PREFIX_BYTES, password_digest, write_header
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the breached password corpus from a text dump: either "
+        "SHA-1 hashes as 'HEX[:count]' lines (the Pwned Passwords format) or, "
+        "with --plaintext, one password per line. Hashes are truncated to "
+        "--prefix-bytes, sorted with an external merge sort, deduplicated and "
+        "written atomically, so running workers pick up the new file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dump',
+            help="Text dump to read (.gz is decompressed), or - for stdin"
+        )
+        parser.add_argument(
+            '--output',
+            default=settings.BREACHED_PASSWORDS_FILE,
+            help="Corpus file to write (default: BREACHED_PASSWORDS_FILE)"
+        )
+        parser.add_argument(
+            '--plaintext',
+            action='store_true',
+            help="The dump holds plaintext passwords instead of SHA-1 hashes"
+        )
+        parser.add_argument(
+            '--prefix-bytes',
+            type=int,
+            default=DEFAULT_PREFIX_BYTES,
+            help="Leading SHA-1 bytes kept per password (8 gives negligible false positives)"
+        )
+        parser.add_argument(
+            '--min-count',
+            type=int,
+            default=1,
+            help="Skip hashes seen fewer times than this (needs HEX:count lines)"
+        )
+        parser.add_argument(
+            '--run-size',
+            type=int,
+            default=2000000,
+            help="Records sorted in memory per temporary run"
+        )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("Pass --output or set BREACHED_PASSWORDS_FILE.")
+        if not 1 <= options['prefix_bytes'] <= 20:
+            raise CommandError("--prefix-bytes must be between 1 and 20.")
+
+        self.options = options
+        self.started = time.perf_counter()
+        output = os.path.abspath(options['output'])
+
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(output)) as workdir:
+            runs = self.write_runs(workdir)
+            written = self.merge_runs(runs, workdir, output)
+
+        size = os.path.getsize(output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} unique hashes ({size / 1024 ** 2:.1f} MiB) to {output} "
+            f"in {time.perf_counter() - self.started:.1f}s."
+        ))
+
+    def open_dump(self):
+        path = self.options['dump']
+        if path == '-':
+            return sys.stdin.buffer
+        try:
+            return gzip.open(path) if path.endswith('.gz') else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(e)
+
+    def records(self):
+        """Truncated digests from the dump, in input order"""
+        width = self.options['prefix_bytes']
+        plaintext = self.options['plaintext']
+        min_count = self.options['min_count']
+        skipped = 0
+
+        with self.open_dump() as dump:
+            for line in dump:
+                line = line.rstrip(b'\r\n')
+                if not line:
+                    continue
+                if plaintext:
+                    yield password_digest(line.decode('utf-8', 'replace'))[:width]
+                    continue
+
+                hex_digest, _, count = line.partition(b':')
+                try:
+                    digest = bytes.fromhex(hex_digest.decode('ascii'))
+                    if count and int(count) < min_count:
+                        continue
+                except ValueError:
+                    skipped += 1
+                    continue
+                if len(digest) != 20:
+                    skipped += 1
+                    continue
+                yield digest[:width]
+
+        if skipped:
+            self.stderr.write(f"Skipped {skipped} malformed line(s).")
+
+    def write_runs(self, workdir):
+        """Sort the input in memory-sized runs written to temporary files"""
+        runs = []
+        run = []
+        read = 0
+
+        def flush():
+            path = os.path.join(workdir, f'run-{len(runs)}')
+            with open(path, 'wb') as f:
+                f.writelines(sorted(set(run)))
+            runs.append(path)
+            run.clear()
+
+        for record in self.records():
+            run.append(record)
+            read += 1
+            if len(run) >= self.options['run_size']:
+                flush()
+                self.progress(f"{read} hashes read, {len(runs)} sorted run(s)")
+        if run or not runs:
+            flush()
+
+        self.progress(f"{read} hashes read, {len(runs)} sorted run(s)")
+        return runs
+
+    def read_run(self, path):
+        width = self.options['prefix_bytes']
+        with open(path, 'rb') as f:
+            while record := f.read(width):
+                yield record
+
+    def merge_runs(self, runs, workdir, output):
+        """Merge the sorted runs into the corpus, dropping duplicates"""
+        written = 0
+        previous = None
+        fd, tmp_path = tempfile.mkstemp(dir=workdir)
+
+        with os.fdopen(fd, 'wb') as out:
+            write_header(out, self.options['prefix_bytes'])
+            for record in heapq.merge(*(self.read_run(path) for path in runs)):
+                if record != previous:
+                    out.write(record)
+                    previous = record
+                    written += 1
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.chmod(tmp_path, 0o644)
+        # Atomic swap: open maps keep the old file until they are reopened
+        os.replace(tmp_path, output)
+        return written
+
+    def progress(self, message):
+        elapsed = time.perf_counter() - self.started
+        self.stderr.write(f"{message} ({elapsed:.1f}s)")
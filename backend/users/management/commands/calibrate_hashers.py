@@ -0,0 +1,133 @@
+"""
+Password Hasher Calibration
+Benchmarks the hasher tiers on this machine and suggests cost parameters
+that hit a target latency per hash
+"""
+import statistics
+import time
+
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.core.management.base import BaseCommand
+
+# Strongest first; the first calibrated tier is suggested as preferred
+TIERS = ('argon2', 'scrypt', 'pbkdf2')
+
+CALIBRATION_PASSWORD = 'calibration-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the argon2, scrypt and pbkdf2 hashers and print .env "
+        "settings that hit the target latency per hash. Parameters never go "
+        "below Django's defaults."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target-ms',
+            type=float,
+            default=250.0,
+            help="Target hashing time per password in milliseconds"
+        )
+        parser.add_argument(
+            '--tier',
+            choices=TIERS,
+            action='append',
+            help="Tier to calibrate (repeatable, default: all)"
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=3,
+            help="Timed runs per measurement (the median is used)"
+        )
+
+    def handle(self, *args, **options):
+        self.samples = options['samples']
+        target = options['target_ms'] / 1000
+        tiers = [tier for tier in TIERS if tier in (options['tier'] or TIERS)]
+
+        self.stdout.write(f"Target: {options['target_ms']:.0f} ms per hash\n")
+
+        settings_lines = []
+        for tier in tiers:
+            try:
+                params, elapsed = getattr(self, f'calibrate_{tier}')(target)
+            except (ImportError, ValueError) as e:
+                self.stdout.write(f"{tier:<8} skipped ({e})")
+                continue
+
+            if not settings_lines:
+                settings_lines.append(f"PASSWORD_HASHER_TIER={tier}")
+            settings_lines.extend(f"{name}={value}" for name, value in params.items())
+
+            summary = ', '.join(f"{name}={value}" for name, value in params.items())
+            self.stdout.write(f"{tier:<8} {summary:<50} {elapsed * 1000:>8.1f} ms")
+
+        if settings_lines:
+            self.stdout.write("\nAdd to .env:")
+            for line in settings_lines:
+                self.stdout.write(line)
+
+    def measure(self, hasher, **kwargs):
+        """Median time of hashing the calibration password"""
+        timings = []
+        for _ in range(self.samples):
+            salt = hasher.salt()
+            started = time.perf_counter()
+            hasher.encode(CALIBRATION_PASSWORD, salt, **kwargs)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def calibrate_pbkdf2(self, target):
+        """Iterations scale linearly with time"""
+        hasher = PBKDF2PasswordHasher()
+        probe = 100000
+        per_iteration = self.measure(hasher, iterations=probe) / probe
+
+        iterations = round(target / per_iteration / 10000) * 10000
+        iterations = max(iterations, PBKDF2PasswordHasher.iterations)
+
+        return (
+            {'PBKDF2_ITERATIONS': iterations},
+            self.measure(hasher, iterations=iterations)
+        )
+
+    def calibrate_scrypt(self, target):
+        """Work factor must be a power of two; double it while it gets closer"""
+        hasher = ScryptPasswordHasher()
+        work_factor = ScryptPasswordHasher.work_factor
+
+        def timed(n):
+            hasher.maxmem = max(2 * 128 * n * hasher.block_size * hasher.parallelism, 64 * 1024 * 1024)
+            return self.measure(hasher, n=n)
+
+        elapsed = timed(work_factor)
+        while elapsed < target:
+            doubled = timed(work_factor * 2)
+            if abs(doubled - target) > abs(elapsed - target):
+                break
+            work_factor, elapsed = work_factor * 2, doubled
+
+        return {'SCRYPT_WORK_FACTOR': work_factor}, elapsed
+
+    def calibrate_argon2(self, target):
+        """Keep Django's memory cost and scale the number of passes"""
+        hasher = Argon2PasswordHasher()
+        hasher._load_library()
+
+        per_pass = self.measure(hasher) / hasher.time_cost
+        hasher.time_cost = max(round(target / per_pass), Argon2PasswordHasher.time_cost)
+
+        return (
+            {
+                'ARGON2_TIME_COST': hasher.time_cost,
+                'ARGON2_MEMORY_COST': hasher.memory_cost,
+                'ARGON2_PARALLELISM': hasher.parallelism,
+            },
+            self.measure(hasher)
+        )
@@ -0,0 +1,68 @@
+"""
+JWT Signing Key Generation
+Creates a new private key in JWT_KEYS_DIR for key rotation
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a JWT signing key in JWT_KEYS_DIR. To rotate, generate the "
+        "key, deploy it so the JWKS endpoint publishes it, wait JWKS_MAX_AGE "
+        "seconds, then set JWT_SIGNING_KEY_ID to it. Delete a retired key once "
+        "the tokens it signed have expired."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kid',
+            help="Key ID (default: current date and time)"
+        )
+        parser.add_argument(
+            '--algorithm',
+            choices=('EdDSA', 'RS256'),
+            default='EdDSA',
+            help="EdDSA generates an Ed25519 key, RS256 a 3072-bit RSA key"
+        )
+        parser.add_argument(
+            '--dir',
+            default=settings.JWT_KEYS_DIR,
+            help="Key directory (default: JWT_KEYS_DIR)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from cryptography.hazmat.primitives import serialization
+            from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+        except ImportError:
+            raise CommandError("Install cryptography to generate signing keys.")
+
+        if not options['dir']:
+            raise CommandError("Set JWT_KEYS_DIR or pass --dir.")
+
+        kid = options['kid'] or timezone.now().strftime('%Y%m%d%H%M%S')
+        path = Path(options['dir']) / f'{kid}.pem'
+        if path.exists():
+            raise CommandError(f"{path} already exists.")
+
+        if options['algorithm'] == 'EdDSA':
+            key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            key = rsa.generate_private_key(public_exponent=65537, key_size=3072)
+
+        pem = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch(mode=0o600)
+        path.write_bytes(pem)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['algorithm']} key {path}"))
+        self.stdout.write(f"Activate it with JWT_SIGNING_KEY_ID={kid}")
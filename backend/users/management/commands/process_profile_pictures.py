@@ -0,0 +1,93 @@
+"""
+Profile Picture Worker
+Generates thumbnails for uploaded profile pictures
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users import pictures
+from users.models import ProfilePicture
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the WebP thumbnails of newly uploaded profile pictures and "
+        "publish them to the users showing each picture. Several workers can "
+        "run at once; each picture is leased to one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Process the pending pictures once and exit instead of polling"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when no picture is pending"
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=120.0,
+            help="Seconds a claimed picture is hidden from other workers"
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=3,
+            help="Attempts before a picture is marked failed"
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+
+        try:
+            while True:
+                picture = self.claim_picture()
+                if picture:
+                    self.process(picture)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def claim_picture(self):
+        """Lease the oldest pending picture no other worker holds"""
+        now = timezone.now()
+        with transaction.atomic():
+            picture = (
+                ProfilePicture.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=ProfilePicture.Status.PENDING)
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lte=now))
+                .order_by('created_at')
+                .first()
+            )
+            if picture:
+                picture.leased_until = now + timedelta(seconds=self.options['lease'])
+                picture.save(update_fields=['leased_until'])
+        return picture
+
+    def process(self, picture):
+        started = time.perf_counter()
+        if not pictures.process(picture, max_attempts=self.options['max_attempts']):
+            self.stderr.write(
+                f"Profile picture {picture.digest[:12]} failed "
+                f"(attempt {picture.attempts}): {picture.last_error}"
+            )
+            return
+
+        self.stdout.write(
+            f"Profile picture {picture.digest[:12]}: {len(picture.thumbnails)} "
+            f"thumbnail(s) in {time.perf_counter() - started:.2f}s"
+        )
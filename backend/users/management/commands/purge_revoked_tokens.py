@@ -0,0 +1,48 @@
+"""
+Revoked Token Compaction
+Deletes revocation records for tokens that have expired anyway
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired rows from the token revocation store in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help="Rows deleted per statement"
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to limit database load"
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = RevokedToken.objects.filter(expires_at__lt=now)
+        deleted = 0
+
+        while True:
+            batch = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+
+            count, _ = RevokedToken.objects.filter(pk__in=batch).delete()
+            deleted += count
+
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired revoked token(s).")
+        )
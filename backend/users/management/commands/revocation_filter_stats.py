@@ -0,0 +1,42 @@
+"""
+Revocation Filter Statistics
+Builds the revoked-token Bloom filter from the store and reports its size,
+build time and false-positive rate, for sizing REVOCATION_FILTER_CAPACITY
+"""
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from users.revocation import RevocationFilter
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the token revocation filter from the database and report its "
+        "rebuild time, memory use and false-positive rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--probes',
+            type=int,
+            default=100000,
+            help="Random token IDs checked to measure the false-positive rate"
+        )
+
+    def handle(self, *args, **options):
+        revocation_filter = RevocationFilter()
+        revocation_filter.refresh()
+
+        # Fresh random IDs are never revoked, so every hit is a false positive
+        probes = options['probes']
+        hits = sum(revocation_filter.might_contain(uuid.uuid4().hex) for _ in range(probes))
+
+        stats = revocation_filter.stats()
+        self.stdout.write(f"Entries:              {stats['entries']}")
+        self.stdout.write(f"Capacity:             {stats['capacity']}")
+        self.stdout.write(f"Size:                 {stats['size_bytes'] / 1024:.1f} KiB")
+        self.stdout.write(f"Rebuild time:         {stats['last_rebuild_seconds'] * 1000:.1f} ms")
+        self.stdout.write(f"Estimated FP rate:    {stats['estimated_error_rate']:.6f}")
+        if probes:
+            self.stdout.write(f"Measured FP rate:     {hits / probes:.6f} ({hits}/{probes} probes)")
@@ -0,0 +1,105 @@
+"""
+Admin Job Worker
+Runs queued bulk admin actions chunk by chunk
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users import jobs
+from users.models import AdminJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued bulk admin actions on users in short primary-key ordered "
+        "transactions. Interrupted jobs resume where they stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Run the queued jobs once and exit instead of polling"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ADMIN_JOB_CHUNK_SIZE,
+            help="Users updated per transaction"
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks to limit database load"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when no job is queued"
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=300.0,
+            help="Seconds a claimed job is hidden from other workers between chunks"
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+
+        try:
+            while True:
+                job = self.claim_job()
+                if job:
+                    self.run(job)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def claim_job(self):
+        """
+        Lease the oldest queued job, or a running one whose worker died.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                AdminJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status__in=[AdminJob.Status.PENDING, AdminJob.Status.RUNNING])
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lte=now))
+                .order_by('created_at')
+                .first()
+            )
+            if job:
+                job.leased_until = now + timedelta(seconds=self.options['lease'])
+                job.save(update_fields=['leased_until'])
+        return job
+
+    def run(self, job):
+        started = time.perf_counter()
+        try:
+            jobs.run(
+                job,
+                chunk_size=self.options['chunk_size'],
+                pause=self.options['pause'],
+                lease=self.options['lease']
+            )
+        except Exception as e:
+            self.stderr.write(f"Admin job {job.pk} ({job.action}) failed: {e}")
+            return
+
+        self.stdout.write(
+            f"Admin job {job.pk} ({job.action}): {job.processed} user(s) "
+            f"updated in {time.perf_counter() - started:.1f}s"
+        )
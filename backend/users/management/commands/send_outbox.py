@@ -0,0 +1,134 @@
+"""
+Email Outbox Worker
+Delivers queued EmailOutbox rows over a single pooled connection
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails, retrying failures with exponential backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Drain the outbox once and exit instead of polling"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help="Number of emails claimed per batch"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when the outbox is empty"
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help="Attempts before an email is marked as failed"
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=30.0,
+            help="Base retry delay in seconds, doubled after every failure"
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=300.0,
+            help="Seconds a claimed email is hidden from other workers"
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        connection = get_connection()
+
+        try:
+            while True:
+                batch = self.claim_batch()
+                if batch:
+                    self.deliver(connection, batch)
+                    continue
+                if options['once']:
+                    break
+                # Release the SMTP connection while idle
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+    def claim_batch(self):
+        """
+        Lease a batch of due emails so concurrent workers skip them.
+        A worker that dies mid-batch releases its emails when the lease ends.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                EmailOutbox.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:self.options['batch_size']]
+            )
+            if batch:
+                EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                    next_attempt_at=now + timedelta(seconds=self.options['lease'])
+                )
+        return batch
+
+    def deliver(self, connection, batch):
+        """Send a claimed batch, recording the outcome of every email"""
+        for email in batch:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or settings.DEFAULT_FROM_EMAIL,
+                [email.to_email],
+                connection=connection,
+            )
+            email.attempts += 1
+
+            try:
+                # No-op while the pooled connection is already open
+                connection.open()
+                message.send()
+            except Exception as e:
+                # Drop the (possibly broken) connection; the next send reopens it
+                connection.close()
+                self.record_failure(email, e)
+            else:
+                email.status = EmailOutbox.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+
+    def record_failure(self, email, error):
+        """Schedule a retry with exponential backoff, or give up"""
+        email.last_error = str(error)
+
+        if email.attempts >= self.options['max_attempts']:
+            email.status = EmailOutbox.Status.FAILED
+            self.stderr.write(f"Giving up on email {email.pk} to {email.to_email}: {error}")
+        else:
+            delay = self.options['backoff'] * 2 ** (email.attempts - 1)
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            self.stderr.write(f"Email {email.pk} failed, retrying in {delay:.0f}s: {error}")
+
+        email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
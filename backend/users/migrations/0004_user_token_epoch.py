@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_revoked_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_epoch",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented to invalidate every token issued so far",
+            ),
+        ),
+    ]
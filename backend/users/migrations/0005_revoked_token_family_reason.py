@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_user_token_epoch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revokedtoken",
+            name="family",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Token family (login session) the token belongs to",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="revokedtoken",
+            name="reason",
+            field=models.CharField(
+                choices=[
+                    ("logout", "Logout"),
+                    ("rotated", "Rotated"),
+                    ("reused", "Family revoked after reuse"),
+                ],
+                default="logout",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="revokedtoken",
+            name="jti",
+            field=models.CharField(
+                help_text="Token ID claim of the revoked token, or the revoked family ID",
+                max_length=64,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:23
+
+from django.db import migrations, models
+
+from users.operations import AddIndexConcurrently, create_index_concurrently, is_postgresql
+
+# Admin search uses case-insensitive prefix lookups, which PostgreSQL runs as
+# UPPER(column::text) LIKE 'TERM%'. Pattern-ops expression indexes let those
+# use an index scan; other databases skip them.
+# Every index is built concurrently on PostgreSQL so the users table keeps
+# taking writes, which requires a non-atomic migration.
+PREFIX_SEARCH_COLUMNS = ("email", "username", "first_name", "last_name")
+
+
+def create_prefix_search_indexes(apps, schema_editor):
+    if not is_postgresql(schema_editor):
+        return
+    for column in PREFIX_SEARCH_COLUMNS:
+        name = f"users_{column}_prefix_idx"
+        create_index_concurrently(
+            schema_editor,
+            name,
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "users" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_search_indexes(apps, schema_editor):
+    if not is_postgresql(schema_editor):
+        return
+    for column in PREFIX_SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "users_{column}_prefix_idx"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0005_revoked_token_family_reason"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(fields=["-created_at", "-id"], name="users_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["role", "-created_at"], name="users_role_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["is_active", "is_verified", "-created_at"],
+                name="users_status_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(fields=["-last_login"], name="users_last_login_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_staff", True), ("is_superuser", True), _connector="OR"
+                ),
+                fields=["-created_at"],
+                name="users_staff_created_idx",
+            ),
+        ),
+        migrations.RunPython(
+            create_prefix_search_indexes,
+            drop_prefix_search_indexes,
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0006_user_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdminJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        help_text="Name of the bulk action (see users.jobs.ACTIONS)",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "selection",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Selected user IDs, or the changelist filters and search selecting the users",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "total",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Users selected when the job was queued (may be an estimate)",
+                    ),
+                ),
+                (
+                    "processed",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Users updated so far"
+                    ),
+                ),
+                (
+                    "last_pk",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Highest user ID already processed; the job resumes after it",
+                    ),
+                ),
+                (
+                    "leased_until",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="A worker owns the job until then; afterwards another may resume it",
+                        null=True,
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Admin Job",
+                "verbose_name_plural": "Admin Jobs",
+                "db_table": "admin_jobs",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "leased_until"],
+                        name="admin_jobs_status_4a8401_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+from users.operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are dropped and built concurrently on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ("users", "0007_admin_job"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="user",
+            name="users_role_created_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name="user",
+            name="users_status_created_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["role", "-created_at", "-id"], name="users_role_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["is_active", "is_verified", "-created_at", "-id"],
+                name="users_status_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["is_verified", "-created_at", "-id"],
+                name="users_verified_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:29
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+from users.operations import create_index_concurrently, is_postgresql
+
+# PostgreSQL enforces the constraint with a unique expression index, built
+# concurrently so the users table keeps taking writes, which requires a
+# non-atomic migration. Other databases add the constraint as usual.
+CONSTRAINT = models.UniqueConstraint(
+    django.db.models.functions.text.Lower("email"),
+    name="users_email_lower_unique",
+    violation_error_message="A user with this email already exists.",
+)
+
+
+def add_constraint(apps, schema_editor):
+    if is_postgresql(schema_editor):
+        create_index_concurrently(
+            schema_editor,
+            CONSTRAINT.name,
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{CONSTRAINT.name}" '
+            f'ON "users" (LOWER("email"))'
+        )
+    else:
+        schema_editor.add_constraint(apps.get_model("users", "User"), CONSTRAINT)
+
+
+def remove_constraint(apps, schema_editor):
+    if is_postgresql(schema_editor):
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{CONSTRAINT.name}"')
+    else:
+        schema_editor.remove_constraint(apps.get_model("users", "User"), CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0008_user_directory_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(model_name="user", constraint=CONSTRAINT),
+            ],
+            database_operations=[
+                migrations.RunPython(add_constraint, remove_constraint),
+            ],
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+from users.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # The users index is built concurrently on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ("users", "0009_user_email_lower_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfilePicture",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "digest",
+                    models.CharField(
+                        help_text="SHA-256 of the original file",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "original",
+                    models.FileField(
+                        db_index=True,
+                        help_text="Stored original, named after its digest",
+                        max_length=255,
+                        upload_to="",
+                    ),
+                ),
+                (
+                    "thumbnails",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="WebP thumbnail file names by size",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("ready", "Ready"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "leased_until",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="A worker owns the picture until then; afterwards another may retry it",
+                        null=True,
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Profile Picture",
+                "verbose_name_plural": "Profile Pictures",
+                "db_table": "profile_pictures",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="profile_picture_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Thumbnail file names by size, filled in once generated",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="profile_picture",
+            field=models.ImageField(
+                blank=True,
+                help_text="User's profile picture (content-addressed original)",
+                null=True,
+                upload_to="profile_pics/",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("profile_picture__gt", "")),
+                fields=["profile_picture"],
+                name="users_profile_picture_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="profilepicture",
+            index=models.Index(
+                fields=["status", "leased_until"], name="profile_pic_status_7116ba_idx"
+            ),
+        ),
+    ]
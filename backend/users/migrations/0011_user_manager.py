@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:48
+
+from django.db import migrations
+import users.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0010_profile_pictures"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
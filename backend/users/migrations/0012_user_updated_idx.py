@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+from users.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built concurrently on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ("users", "0011_user_manager"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(fields=["updated_at"], name="users_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0012_user_updated_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="email",
+            field=models.EmailField(
+                help_text="User's email address (used for login)", max_length=254
+            ),
+        ),
+    ]
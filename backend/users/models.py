@@ -2,17 +2,46 @@
 Custom User Model with additional fields for JWT Authentication
 Extends AbstractUser for maximum flexibility
 """
-from django.contrib.auth.models import AbstractUser
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+from . import cache
+from .hashing import hashing_service
+
+# User fields whose token claims (see tokens.USER_CLAIMS) grant privileges
+CLAIM_FIELDS = ('role', 'is_active', 'is_verified')
+
+
+class UserManager(BaseUserManager):
+    """
+    User manager hashing passwords through User.set_password, so accounts
+    created by registration and commands use the hashing pool too
+    """
+    def _create_user(self, username, email, password, **extra_fields):
+        if not username:
+            raise ValueError("The given username must be set")
+        user = self.model(
+            username=self.model.normalize_username(username),
+            email=self.normalize_email(email),
+            **extra_fields
+        )
+        user.set_password(password)
+        user.save(using=self._db)
+        return user
+
+    def get_by_natural_key(self, username):
+        return self.get(email__lower=username.lower())
+
 
 class User(AbstractUser):
     """
     Custom User model with additional fields
     """
     email = models.EmailField(
-        unique=True,
         help_text="User's email address (used for login)"
     )
     first_name = models.CharField(
@@ -38,7 +67,13 @@ class User(AbstractUser):
         upload_to='profile_pics/',
         blank=True,
         null=True,
-        help_text="User's profile picture"
+        help_text="User's profile picture (content-addressed original)"
+    )
+    profile_picture_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Thumbnail file names by size, filled in once generated"
     )
     bio = models.TextField(
         blank=True,
@@ -56,6 +91,10 @@ class User(AbstractUser):
         null=True,
         help_text="IP address of last login"
     )
+    token_epoch = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented to invalidate every token issued so far"
+    )
     
     # Role-based access
     class Role(models.TextChoices):
@@ -74,6 +113,8 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserManager()
+
     # Use email as the unique identifier for authentication
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -83,6 +124,47 @@ class User(AbstractUser):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
+        constraints = [
+            # The only unique index on email. Emails are stored lowercased,
+            # so look them up with email__lower to use it; this also rejects
+            # case variants written by any path that skips the normalization
+            models.UniqueConstraint(
+                Lower('email'),
+                name='users_email_lower_unique',
+                violation_error_message="A user with this email already exists."
+            ),
+        ]
+        indexes = [
+            # Admin changelist and user directory: default ordering (and
+            # keyset pagination on it), then each filter combined with it
+            models.Index(fields=['-created_at', '-id'], name='users_created_idx'),
+            models.Index(
+                fields=['role', '-created_at', '-id'],
+                name='users_role_created_idx'
+            ),
+            models.Index(
+                fields=['is_active', 'is_verified', '-created_at', '-id'],
+                name='users_status_created_idx'
+            ),
+            models.Index(
+                fields=['is_verified', '-created_at', '-id'],
+                name='users_verified_created_idx'
+            ),
+            models.Index(fields=['-last_login'], name='users_last_login_idx'),
+            # Availability filter syncs pick up users saved since the last one
+            models.Index(fields=['updated_at'], name='users_updated_idx'),
+            # Fan-out of generated thumbnails to the users of a picture
+            models.Index(
+                fields=['profile_picture'],
+                name='users_profile_picture_idx',
+                condition=models.Q(profile_picture__gt='')
+            ),
+            models.Index(
+                fields=['-created_at'],
+                name='users_staff_created_idx',
+                condition=models.Q(is_staff=True) | models.Q(is_superuser=True)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.email} ({self.get_full_name()})"
@@ -115,12 +197,371 @@ class User(AbstractUser):
             )
         return None
     
+    def set_password(self, raw_password):
+        """Hash the password in the hashing pool"""
+        if raw_password is None:
+            super().set_password(raw_password)
+            return
+        self.password = hashing_service.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Verify the password in the hashing pool, re-hashing it when the
+        stored hash uses outdated hasher settings
+        """
+        is_correct, must_update = hashing_service.check_password(
+            raw_password,
+            self.password
+        )
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        """Async variant of check_password"""
+        is_correct, must_update = await hashing_service.acheck_password(
+            raw_password,
+            self.password
+        )
+        if is_correct and must_update:
+            self.password = await hashing_service.amake_password(raw_password)
+            await self.asave(update_fields=['password'])
+        return is_correct
+    
     def update_last_login_ip(self, ip_address):
         """Update the last login IP address"""
         self.last_login_ip = ip_address
         self.save(update_fields=['last_login_ip'])
+
+    def record_login(self, ip_address):
+        """
+        Record login time and IP in a single UPDATE, or queue them on the
+        login write buffer when buffering is enabled
+        """
+        from .login_buffer import login_buffer
+
+        self.last_login = timezone.now()
+        self.last_login_ip = ip_address
+
+        if settings.LOGIN_WRITE_BUFFER_ENABLED:
+            login_buffer.add(self.pk, self.last_login, ip_address)
+        else:
+            User.objects.filter(pk=self.pk).update(
+                last_login=self.last_login,
+                last_login_ip=ip_address
+            )
+            cache.invalidate(self.pk)
+
+    async def arecord_login(self, ip_address):
+        """Async variant of record_login"""
+        from .login_buffer import login_buffer
+
+        self.last_login = timezone.now()
+        self.last_login_ip = ip_address
+
+        if settings.LOGIN_WRITE_BUFFER_ENABLED:
+            # A full buffer flushes synchronously
+            await sync_to_async(login_buffer.add)(self.pk, self.last_login, ip_address)
+        else:
+            await User.objects.filter(pk=self.pk).aupdate(
+                last_login=self.last_login,
+                last_login_ip=ip_address
+            )
+            await cache.ainvalidate(self.pk)
     
+    def revoke_tokens(self):
+        """Invalidate every token issued to this user so far"""
+        User.objects.filter(pk=self.pk).update(token_epoch=models.F('token_epoch') + 1)
+        cache.invalidate(self.pk)
+        self.refresh_from_db(fields=['token_epoch'])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded token claim values to detect changes on save"""
+        user = super().from_db(db, field_names, values)
+        user._loaded_claims = user._claim_values()
+        return user
+
+    def _claim_values(self):
+        # Deferred fields are left out rather than loaded
+        return {name: self.__dict__[name] for name in CLAIM_FIELDS if name in self.__dict__}
+
+    def _privileges_reduced(self, update_fields):
+        """
+        Whether this save takes away something issued tokens still grant:
+        deactivation, demotion or loss of verification
+        """
+        saved = set(CLAIM_FIELDS)
+        if update_fields is not None:
+            saved &= set(update_fields)
+        loaded = getattr(self, '_loaded_claims', None)
+        if loaded is None:
+            # Built without a load (e.g. User(pk=...)): assume the worst
+            return bool(saved)
+
+        current = self._claim_values()
+        before = {name: loaded[name] for name in saved if name in loaded and name in current}
+        return (
+            before.get('is_active', False) > current.get('is_active', False)
+            or before.get('is_verified', False) > current.get('is_verified', False)
+            or ROLE_RANKS.get(before.get('role'), 0) > ROLE_RANKS.get(current.get('role'), 0)
+        )
+
     def save(self, *args, **kwargs):
-        """Override save to ensure email is lowercase"""
+        """
+        Override save to ensure email is lowercase, and to revoke issued
+        tokens when their claims grant more than the user now has
+        """
         self.email = self.email.lower().strip()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        revoke = not self._state.adding and self._privileges_reduced(kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        cache.invalidate(self.pk)
+        if revoke:
+            # Access tokens only re-check the epoch, so their stale claims
+            # must not outlive the change. Other claim changes reach new
+            # access tokens on the next refresh.
+            self.revoke_tokens()
+        self._loaded_claims = self._claim_values()
+
+        from .availability import availability_filter
+        availability_filter.add_user(self)
+
+    def delete(self, *args, **kwargs):
+        """Override delete to drop the cached row"""
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        cache.invalidate(user_id)
+        return result
+
+
+# Lets email lookups match the LOWER("email") unique index
+User._meta.get_field('email').register_lookup(Lower)
+
+# Roles by privilege, to tell demotions from promotions
+ROLE_RANKS = {
+    User.Role.USER: 0,
+    User.Role.MODERATOR: 1,
+    User.Role.ADMIN: 2,
+}
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued by request handlers and delivered by the
+    send_outbox management command
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(
+        max_length=254,
+        blank=True,
+        help_text="Sender address (defaults to DEFAULT_FROM_EMAIL)"
+    )
+    to_email = models.EmailField(
+        help_text="Recipient address"
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time the next delivery attempt may run"
+    )
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Email Outbox'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked (logged out or rotated) refresh token, or a revoked token family.
+    Rows are only needed until the token would have expired anyway and are
+    removed by the purge_revoked_tokens management command.
+    """
+    class Reason(models.TextChoices):
+        LOGOUT = 'logout', 'Logout'
+        ROTATED = 'rotated', 'Rotated'
+        REUSED = 'reused', 'Family revoked after reuse'
+
+    jti = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Token ID claim of the revoked token, or the revoked family ID"
+    )
+    family = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="Token family (login session) the token belongs to"
+    )
+    reason = models.CharField(
+        max_length=10,
+        choices=Reason.choices,
+        default=Reason.LOGOUT
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='revoked_tokens',
+        blank=True,
+        null=True
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="Expiry of the revoked token"
+    )
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'revoked_tokens'
+        verbose_name = 'Revoked Token'
+        verbose_name_plural = 'Revoked Tokens'
+
+    def __str__(self):
+        return f"{self.jti} (expires {self.expires_at:%Y-%m-%d %H:%M})"
+
+
+class AdminJob(models.Model):
+    """
+    Bulk admin action on users, applied in primary-key ordered chunks by the
+    run_admin_jobs management command so no statement locks many rows
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    action = models.CharField(
+        max_length=50,
+        help_text="Name of the bulk action (see users.jobs.ACTIONS)"
+    )
+    selection = models.JSONField(
+        default=dict,
+        help_text="Selected user IDs, or the changelist filters and search selecting the users"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        help_text="Users selected when the job was queued (may be an estimate)"
+    )
+    processed = models.PositiveIntegerField(
+        default=0,
+        help_text="Users updated so far"
+    )
+    last_pk = models.BigIntegerField(
+        default=0,
+        help_text="Highest user ID already processed; the job resumes after it"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    leased_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="A worker owns the job until then; afterwards another may resume it"
+    )
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'admin_jobs'
+        verbose_name = 'Admin Job'
+        verbose_name_plural = 'Admin Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'leased_until']),
+        ]
+
+    def __str__(self):
+        return f"{self.action} ({self.status}, {self.processed}/{self.total})"
+
+
+class ProfilePicture(models.Model):
+    """
+    Uploaded profile picture, stored once per content hash however many
+    users upload it. Pending pictures get their thumbnails from the
+    process_profile_pictures management command.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    digest = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the original file"
+    )
+    original = models.FileField(
+        max_length=255,
+        db_index=True,
+        help_text="Stored original, named after its digest"
+    )
+    thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="WebP thumbnail file names by size"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    leased_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="A worker owns the picture until then; afterwards another may retry it"
+    )
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'profile_pictures'
+        verbose_name = 'Profile Picture'
+        verbose_name_plural = 'Profile Pictures'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'leased_until']),
+        ]
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.status})"
@@ -0,0 +1,160 @@
+"""
+Large Table Pagination
+Paginators that avoid exact COUNT(*) and OFFSET scans on big tables
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from the PostgreSQL planner: table statistics for an
+    unfiltered queryset, EXPLAIN for a filtered one. None when no estimate is
+    available (other databases, or a table that was never analyzed).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    return int(estimate) if estimate >= 0 else None
+
+
+def count_rows(queryset):
+    """
+    (count, is_estimate) for a queryset: the planner estimate once it reaches
+    ADMIN_EXACT_COUNT_THRESHOLD, an exact COUNT(*) below that
+    """
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_THRESHOLD:
+        return queryset.count(), False
+    return estimate, True
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting with count_rows(), so large results are estimated
+    instead of scanned. `is_estimate` tells which one `count` is.
+    """
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        count, self.is_estimate = count_rows(self.object_list)
+        return count
+
+
+def keyset_filter(queryset, created_at, pk, older=True):
+    """
+    Rows past (created_at, pk) in newest-first order, or before it when
+    `older` is False. The redundant created_at bound keeps the filter an
+    index range scan on PostgreSQL.
+    """
+    if older:
+        return queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(pk__lt=pk)
+        )
+    return queryset.filter(created_at__gte=created_at).filter(
+        Q(created_at__gt=created_at) | Q(pk__gt=pk)
+    )
+
+
+KeysetCursor = namedtuple('KeysetCursor', ['created_at', 'pk', 'reverse'])
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination on the (created_at, id) keyset.
+    DRF's CursorPagination positions on the first ordering field plus an
+    offset into rows sharing it; comparing both fields instead makes every
+    page one index range scan, whatever its depth. No count is returned.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        if self.cursor:
+            queryset = keyset_filter(
+                queryset,
+                self.cursor.created_at,
+                self.cursor.pk,
+                older=not reverse
+            )
+        ordering = ('created_at', 'id') if reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(KeysetCursor(last.created_at, last.pk, False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        first = self.page[0]
+        return self.encode_cursor(KeysetCursor(first.created_at, first.pk, True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            created_at, pk, reverse = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            return KeysetCursor(datetime.fromisoformat(created_at), int(pk), reverse == '1')
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        position = f'{cursor.created_at.isoformat()}|{cursor.pk}|{int(cursor.reverse)}'
+        encoded = urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
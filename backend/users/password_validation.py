@@ -0,0 +1,114 @@
+"""
+Breached Password Validation
+Rejects passwords found in a breached-password corpus by binary-searching a
+memory-mapped file of sorted SHA-1 prefixes
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.utils.translation import gettext as _
+
+# File layout: a 16-byte header, then sorted, unique fixed-width records of
+# the leading `prefix_bytes` bytes of each password's SHA-1 digest
+MAGIC = b'PWSHA1\x00\x01'
+HEADER = struct.Struct('<8sB7x')
+DEFAULT_PREFIX_BYTES = 8
+
+
+def password_digest(password):
+    return hashlib.sha1(password.encode()).digest()
+
+
+def write_header(stream, prefix_bytes):
+    stream.write(HEADER.pack(MAGIC, prefix_bytes))
+
+
+class BreachedPasswordCorpus:
+    """
+    Read-only view of a corpus file. The file is memory-mapped, so every
+    worker process shares the same page cache copy instead of loading it.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ImproperlyConfigured(f"{path} is not a breached password corpus")
+        magic, self.prefix_bytes = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or not self.prefix_bytes:
+            raise ImproperlyConfigured(f"{path} is not a breached password corpus")
+        self.count = (len(self._mmap) - HEADER.size) // self.prefix_bytes
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, digest):
+        key = digest[:self.prefix_bytes]
+        width = self.prefix_bytes
+        data = self._mmap
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * width
+            record = data[offset:offset + width]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def close(self):
+        self._mmap.close()
+
+
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(path):
+    """
+    Shared corpus for `path`, reopened when the file has been replaced (the
+    build command swaps in a new file atomically)
+    """
+    try:
+        inode = os.stat(path).st_ino
+    except OSError as e:
+        raise ImproperlyConfigured(f"Breached password corpus unavailable: {e}")
+
+    with _corpora_lock:
+        corpus = _corpora.get(path)
+        if corpus is None or corpus.inode != inode:
+            # Requests still searching the old map keep it alive until done
+            corpus = _corpora[path] = BreachedPasswordCorpus(path)
+        return corpus
+
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password does not appear in the breached-password
+    corpus at BREACHED_PASSWORDS_FILE (built by build_breached_passwords).
+    Does nothing while no corpus is configured.
+    """
+    def __init__(self, path=None):
+        self.path = path or settings.BREACHED_PASSWORDS_FILE
+
+    def validate(self, password, user=None):
+        if not self.path:
+            return
+        if password_digest(password) in get_corpus(self.path):
+            raise ValidationError(
+                _("This password has appeared in a data breach and can't be used."),
+                code='password_breached',
+            )
+
+    def get_help_text(self):
+        return _("Your password can't be one that has appeared in a data breach.")
@@ -0,0 +1,219 @@
+"""
+Profile Picture Pipeline
+Size-limited streaming uploads, content-addressed storage and background
+generation of square WebP thumbnails
+"""
+import hashlib
+import logging
+import posixpath
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import cache
+from .models import ProfilePicture, User
+
+logger = logging.getLogger(__name__)
+
+PICTURE_FIELD = 'profile_picture'
+
+# Accepted formats and the extension the original is stored under
+FORMATS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+    'GIF': '.gif',
+}
+
+# Room for the other form fields and multipart boundaries in a request body
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class PictureTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'picture_too_large'
+
+    def __init__(self):
+        limit = settings.PROFILE_PICTURE_MAX_SIZE / 1024 ** 2
+        super().__init__({
+            PICTURE_FIELD: [f"Profile pictures may be at most {limit:g} MiB."]
+        })
+
+
+class ProfilePictureUploadHandler(FileUploadHandler):
+    """
+    Upload handler placed ahead of Django's, so an oversized picture is
+    refused from its Content-Length or while it streams in, before any
+    handler buffers it in memory or on disk
+    """
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > settings.PROFILE_PICTURE_MAX_SIZE + MULTIPART_OVERHEAD:
+            raise PictureTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.PROFILE_PICTURE_MAX_SIZE:
+            raise PictureTooLarge()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def inspect_picture(upload):
+    """
+    Format of an uploaded picture, read from its header only: the pixels are
+    decoded by the thumbnail worker, not on the request thread. Raises
+    ValueError for files that are not an accepted, reasonably sized image.
+    """
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValueError("Upload a valid image.")
+    finally:
+        upload.seek(0)
+
+    if image_format not in FORMATS:
+        raise ValueError(f"Use one of these formats: {', '.join(FORMATS)}.")
+    if width * height > settings.PROFILE_PICTURE_MAX_PIXELS:
+        raise ValueError("The image has too many pixels.")
+    return image_format
+
+
+def content_digest(upload):
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    upload.seek(0)
+    return sha256.hexdigest()
+
+
+def original_name(digest, extension):
+    return posixpath.join('profile_pics', digest[:2], digest + extension)
+
+
+def thumbnail_name(digest, size):
+    return posixpath.join('profile_pics', 'thumbs', digest[:2], f'{digest}-{size}.webp')
+
+
+def _save_once(name, content):
+    """
+    Store content under its content-addressed name unless it is already
+    there. Returns the name actually used (a lost race gets a suffix).
+    """
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, content)
+
+
+def store(upload, image_format):
+    """
+    Store an uploaded picture by content hash and return its ProfilePicture.
+    A picture uploaded before is neither written nor processed again.
+    """
+    digest = content_digest(upload)
+    picture = ProfilePicture.objects.filter(digest=digest).first()
+    if picture is not None:
+        return picture
+
+    name = _save_once(original_name(digest, FORMATS[image_format]), upload)
+    try:
+        with transaction.atomic():
+            return ProfilePicture.objects.create(digest=digest, original=name)
+    except IntegrityError:
+        # Stored concurrently by another request
+        return ProfilePicture.objects.get(digest=digest)
+
+
+def picture_urls(user):
+    """Public URLs of a user's thumbnails by size, once generated"""
+    return {
+        size: default_storage.url(name)
+        for size, name in user.profile_picture_thumbnails.items()
+    }
+
+
+def render_thumbnails(picture):
+    """Generate (or reuse) the WebP thumbnails of a picture; {size: name}"""
+    with picture.original.open('rb') as f, Image.open(f) as image:
+        if image.width * image.height > settings.PROFILE_PICTURE_MAX_PIXELS:
+            raise ValueError("The image has too many pixels.")
+        image = ImageOps.exif_transpose(image)
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        thumbnails = {}
+        for size in settings.PROFILE_PICTURE_SIZES:
+            name = thumbnail_name(picture.digest, size)
+            if not default_storage.exists(name):
+                thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                buffer = BytesIO()
+                thumbnail.save(buffer, 'WEBP', quality=settings.PROFILE_PICTURE_WEBP_QUALITY)
+                name = _save_once(name, ContentFile(buffer.getvalue()))
+            thumbnails[str(size)] = name
+    return thumbnails
+
+
+def publish(picture):
+    """Copy a ready picture's thumbnails onto every user showing it"""
+    users = User.objects.filter(profile_picture=picture.original.name)
+    user_ids = list(users.values_list('pk', flat=True))
+    if not user_ids:
+        return 0
+
+    # Bumping updated_at changes the profile ETag, so clients refetch
+    User.objects.filter(pk__in=user_ids, profile_picture=picture.original.name).update(
+        profile_picture_thumbnails=picture.thumbnails,
+        updated_at=timezone.now()
+    )
+    cache.invalidate(*user_ids)
+    return len(user_ids)
+
+
+def publish_if_ready(name):
+    """Publish the thumbnails of the picture stored as `name` if they are ready"""
+    picture = ProfilePicture.objects.filter(
+        original=name,
+        status=ProfilePicture.Status.READY
+    ).first()
+    if picture is not None:
+        publish(picture)
+
+
+def process(picture, max_attempts=3, retry_delay=60):
+    """
+    Render a pending picture's thumbnails and publish them to its users.
+    Failures are retried after `retry_delay` seconds, up to `max_attempts`.
+    """
+    picture.attempts += 1
+    try:
+        picture.thumbnails = render_thumbnails(picture)
+    except Exception as e:
+        picture.last_error = str(e)
+        if picture.attempts >= max_attempts:
+            picture.status = ProfilePicture.Status.FAILED
+            picture.leased_until = None
+        else:
+            picture.leased_until = timezone.now() + timedelta(seconds=retry_delay)
+        picture.save(update_fields=['attempts', 'last_error', 'status', 'leased_until'])
+        logger.warning("Profile picture %s failed: %s", picture.digest, e)
+        return False
+
+    picture.status = ProfilePicture.Status.READY
+    picture.processed_at = timezone.now()
+    picture.leased_until = None
+    picture.save(update_fields=[
+        'attempts', 'thumbnails', 'status', 'processed_at', 'leased_until'
+    ])
+    publish(picture)
+    return True
@@ -0,0 +1,188 @@
+"""
+Token Revocation Store
+Records revoked refresh token IDs and token families until the tokens
+expire, with a per-process Bloom filter in front so unrevoked tokens are
+checked without a query
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .bloom import SyncedBloomFilter
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationFilter(SyncedBloomFilter):
+    """
+    Bloom filter of revoked token IDs, synced from the revocation store every
+    REVOCATION_FILTER_SYNC_INTERVAL seconds and rebuilt to drop expired tokens
+    """
+    name = 'Revocation filter'
+
+    def get_capacity(self):
+        return settings.REVOCATION_FILTER_CAPACITY
+
+    def get_error_rate(self):
+        return settings.REVOCATION_FILTER_ERROR_RATE
+
+    def get_sync_interval(self):
+        return settings.REVOCATION_FILTER_SYNC_INTERVAL
+
+    def get_rebuild_interval(self):
+        return settings.REVOCATION_FILTER_REBUILD_INTERVAL
+
+    def load_keys(self, now):
+        live = RevokedToken.objects.filter(expires_at__gt=now)
+        return live.count(), live.values_list('jti', flat=True).iterator(chunk_size=10000)
+
+    def load_keys_since(self, since):
+        recent = RevokedToken.objects.filter(revoked_at__gte=since)
+        return recent.values_list('jti', flat=True)
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.false_positives = 0
+
+    def record_hit(self, revoked):
+        """Record whether a filter hit was confirmed by the store"""
+        if not revoked:
+            self.false_positives += 1
+
+    def stats(self):
+        stats = super().stats()
+        stats['false_positives'] = self.false_positives
+        stats['false_positive_rate'] = (
+            self.false_positives / self.checks if self.checks else None
+        )
+        return stats
+
+
+revocation_filter = RevocationFilter()
+
+
+def warm():
+    """
+    Build the filter at server start instead of on the first request.
+    Without a usable database it is built on first use instead.
+    """
+    if not settings.REVOCATION_FILTER_ENABLED:
+        return
+    try:
+        revocation_filter.refresh()
+    except DatabaseError as e:
+        logger.warning("Revocation filter not built at startup: %s", e)
+
+
+def _revoked_token(token, reason=RevokedToken.Reason.LOGOUT):
+    return RevokedToken(
+        jti=token[api_settings.JTI_CLAIM],
+        family=token.get('fam') or '',
+        reason=reason,
+        user_id=token.get(api_settings.USER_ID_CLAIM),
+        expires_at=datetime_from_epoch(token['exp']),
+    )
+
+
+def is_revoked(jti):
+    """Check whether a token ID has been revoked (filter, then unique index)"""
+    if not settings.REVOCATION_FILTER_ENABLED:
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    if revocation_filter.needs_refresh():
+        revocation_filter.refresh()
+    if not revocation_filter.might_contain(jti):
+        return False
+
+    revoked = RevokedToken.objects.filter(jti=jti).exists()
+    revocation_filter.record_hit(revoked)
+    return revoked
+
+
+async def ais_revoked(jti):
+    """Async variant of is_revoked"""
+    if not settings.REVOCATION_FILTER_ENABLED:
+        return await RevokedToken.objects.filter(jti=jti).aexists()
+
+    if revocation_filter.needs_refresh():
+        await sync_to_async(revocation_filter.refresh)()
+    if not revocation_filter.might_contain(jti):
+        return False
+
+    revoked = await RevokedToken.objects.filter(jti=jti).aexists()
+    revocation_filter.record_hit(revoked)
+    return revoked
+
+
+def revoke(token):
+    """Revoke a token; revoking it twice is a no-op"""
+    revoked = _revoked_token(token)
+    RevokedToken.objects.bulk_create([revoked], ignore_conflicts=True)
+    revocation_filter.add(revoked.jti)
+
+
+async def arevoke(token):
+    """Async variant of revoke"""
+    revoked = _revoked_token(token)
+    await RevokedToken.objects.abulk_create([revoked], ignore_conflicts=True)
+    revocation_filter.add(revoked.jti)
+
+
+def revoke_family(token):
+    """Revoke every token rotated from the same login session"""
+    family = token.get('fam')
+    if not family:
+        return
+
+    # Descendants expire at most one refresh lifetime from now
+    RevokedToken.objects.bulk_create([
+        RevokedToken(
+            jti=family,
+            family=family,
+            reason=RevokedToken.Reason.REUSED,
+            user_id=token.get(api_settings.USER_ID_CLAIM),
+            expires_at=timezone.now() + api_settings.REFRESH_TOKEN_LIFETIME,
+        )
+    ], ignore_conflicts=True)
+    revocation_filter.add(family)
+
+
+def rotate(token):
+    """
+    Revoke a refresh token as it is exchanged for its successor.
+    The INSERT on the unique jti is both the check and the write, so exactly
+    one request wins. A loser within REFRESH_TOKEN_REUSE_GRACE of the winner
+    is a parallel refresh and may proceed; any other reuse revokes the whole
+    family and raises TokenError.
+    """
+    revoked = _revoked_token(token, RevokedToken.Reason.ROTATED)
+    try:
+        with transaction.atomic():
+            revoked.save(force_insert=True)
+    except IntegrityError:
+        previous = RevokedToken.objects.filter(jti=revoked.jti).values_list(
+            'reason', 'revoked_at'
+        ).first()
+        grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE)
+        reused = (
+            previous is None
+            or previous[0] != RevokedToken.Reason.ROTATED
+            or timezone.now() - previous[1] > grace
+        )
+        if reused:
+            revoke_family(token)
+            logger.warning(
+                "Refresh token reuse detected for user %s; revoked family %s",
+                revoked.user_id, revoked.family
+            )
+            raise TokenError("Token is blacklisted")
+
+    revocation_filter.add(revoked.jti)
@@ -0,0 +1,25 @@
+"""
+OpenAPI Extensions
+Security schemes drf-spectacular cannot derive for the users app
+authentication classes
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Bearer JWT scheme, as for simplejwt's JWTAuthentication"""
+    target_class = 'users.authentication.StatelessJWTAuthentication'
+
+
+class IntrospectionClientScheme(OpenApiAuthenticationExtension):
+    """HTTP Basic client credentials of introspection resource servers"""
+    target_class = 'users.authentication.IntrospectionClientAuthentication'
+    name = 'introspectionClientAuth'
+
+    def get_security_definition(self, auto_schema):
+        return {
+            'type': 'http',
+            'scheme': 'basic',
+            'description': "Client ID and secret from INTROSPECTION_CLIENTS",
+        }
@@ -5,8 +5,18 @@ Handles registration, login, profile management, and password reset
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.conf import settings
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from . import cache, pictures
+from .introspection import TOKEN_TYPE_HINTS
 from .models import User
+from .tokens import UserRefreshToken, token_epoch
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -34,28 +44,26 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             'password',
             'password_confirm'
         )
+        # Uniqueness is enforced by the database on insert (see create), so
+        # the UniqueValidators ModelSerializer would add are dropped
         extra_kwargs = {
-            'email': {'required': True},
+            'email': {'required': True, 'validators': []},
+            'username': {'validators': [UnicodeUsernameValidator()]},
             'first_name': {'required': True},
             'last_name': {'required': True},
         }
 
+    # Error reported for a violated unique constraint, by constraint name
+    # fragment (PostgreSQL names the constraint, SQLite names the column)
+    UNIQUE_ERRORS = (
+        ('username', "A user with this username already exists."),
+        ('email', "A user with this email already exists."),
+    )
+
     def validate_email(self, value):
-        """Validate email is unique"""
-        if User.objects.filter(email=value.lower()).exists():
-            raise serializers.ValidationError(
-                "A user with this email already exists."
-            )
+        """Normalize email"""
         return value.lower()
 
-    def validate_username(self, value):
-        """Validate username is unique"""
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError(
-                "A user with this username already exists."
-            )
-        return value
-
     def validate(self, attrs):
         """Validate password confirmation"""
         if attrs['password'] != attrs['password_confirm']:
@@ -72,20 +80,35 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        """Create new user with encrypted password"""
+        """
+        Create new user with encrypted password in a single INSERT, mapping
+        unique constraint violations to field errors
+        """
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
-        
-        user = User.objects.create_user(
-            password=password,
-            **validated_data
-        )
-        return user
 
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    password=password,
+                    **validated_data
+                )
+        except IntegrityError as e:
+            raise serializers.ValidationError(self.unique_error(e)) from e
 
-class UserLoginSerializer(serializers.Serializer):
+    def unique_error(self, error):
+        """Field error for a unique constraint violation"""
+        diag = getattr(error.__cause__, 'diag', None)
+        constraint = getattr(diag, 'constraint_name', None) or str(error)
+        for field, message in self.UNIQUE_ERRORS:
+            if field in constraint:
+                return {field: [message]}
+        raise error
+
+
+class UserCredentialsSerializer(serializers.Serializer):
     """
-    Serializer for user login
+    Serializer for login credentials (field validation only)
     """
     email = serializers.EmailField()
     password = serializers.CharField(
@@ -93,6 +116,12 @@ class UserLoginSerializer(serializers.Serializer):
         write_only=True
     )
 
+
+class UserLoginSerializer(UserCredentialsSerializer):
+    """
+    Serializer for user login
+    """
+
     def validate(self, attrs):
         """Validate user credentials"""
         email = attrs.get('email')
@@ -124,12 +153,28 @@ class UserLoginSerializer(serializers.Serializer):
             )
 
 
+class ProfilePictureField(serializers.FileField):
+    """
+    Profile picture upload, checked from the image header only; the pixels
+    are decoded by the thumbnail worker instead of the request thread
+    """
+    def to_internal_value(self, data):
+        upload = super().to_internal_value(data)
+        try:
+            upload.image_format = pictures.inspect_picture(upload)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e), code='invalid_image')
+        return upload
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for user profile (view/update)
     """
     age = serializers.ReadOnlyField()
     full_name = serializers.SerializerMethodField()
+    profile_picture = ProfilePictureField(required=False, allow_null=True)
+    profile_picture_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = User
@@ -145,6 +190,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'age',
             'bio',
             'profile_picture',
+            'profile_picture_thumbnails',
             'role',
             'is_verified',
             'created_at',
@@ -166,6 +212,129 @@ class UserProfileSerializer(serializers.ModelSerializer):
         """Return user's full name"""
         return obj.get_full_name()
 
+    def get_profile_picture_thumbnails(self, obj) -> dict[str, str]:
+        """Thumbnail URLs by size; empty until the worker has made them"""
+        request = self.context.get('request')
+        urls = pictures.picture_urls(obj)
+        if request is not None:
+            urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+        return urls
+
+    def store_picture(self):
+        """
+        Store an uploaded picture by content hash and return the column
+        values it sets, to save with the other fields. Call this before
+        locking the row: it writes the upload to storage.
+        """
+        if 'profile_picture' not in self.validated_data:
+            return {}
+        upload = self.validated_data['profile_picture']
+        if isinstance(upload, File):
+            picture = pictures.store(upload, upload.image_format)
+            return {
+                'profile_picture': picture.original.name,
+                'profile_picture_thumbnails': picture.thumbnails,
+            }
+        if not upload:
+            return {'profile_picture_thumbnails': {}}
+        return {}
+
+    def set_changed_fields(self, instance, validated_data):
+        """
+        Assign the validated values that differ from the instance and return
+        the columns to save (none when nothing changed). Pictures must have
+        gone through store_picture(), so re-uploading the current one is no
+        change either.
+        """
+        changed = [
+            name for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+        return [*changed, 'updated_at'] if changed else []
+
+    def update(self, instance, validated_data):
+        """Write only the changed columns instead of the whole row"""
+        update_fields = self.set_changed_fields(instance, validated_data)
+        if update_fields:
+            instance.save(update_fields=update_fields)
+            # The worker may have finished the new picture before this
+            # row committed; catch up once it has
+            pending = 'profile_picture' in update_fields and not instance.profile_picture_thumbnails
+            if pending and instance.profile_picture:
+                name = instance.profile_picture.name
+                transaction.on_commit(lambda: pictures.publish_if_ready(name))
+        return instance
+
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """
+    Read-only user listing for moderators and admins.
+    Pass `fields` to serialize only those fields.
+    """
+    full_name = serializers.SerializerMethodField()
+
+    # Model columns read by fields that are not columns themselves
+    field_sources = {
+        'full_name': ('first_name', 'last_name'),
+    }
+
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'email',
+            'username',
+            'first_name',
+            'last_name',
+            'full_name',
+            'role',
+            'is_active',
+            'is_verified',
+            'created_at',
+            'last_login'
+        )
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def columns(cls, fields):
+        """Model columns needed to serialize `fields`"""
+        columns = []
+        for name in fields:
+            columns.extend(cls.field_sources.get(name, (name,)))
+        return columns
+
+    def get_full_name(self, obj) -> str:
+        """Return user's full name"""
+        return obj.get_full_name()
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    """
+    Serializer for availability checks of an email and/or username
+    """
+    email = serializers.EmailField(required=False)
+    username = serializers.CharField(
+        required=False,
+        max_length=150,
+        validators=[UnicodeUsernameValidator()]
+    )
+
+    def validate(self, attrs):
+        """Require at least one value to check"""
+        if not attrs:
+            raise serializers.ValidationError(
+                "Provide an email and/or a username."
+            )
+        return attrs
+
 
 class PasswordChangeSerializer(serializers.Serializer):
     """
@@ -214,6 +383,7 @@ class PasswordChangeSerializer(serializers.Serializer):
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
         user.save()
+        user.revoke_tokens()
         return user
 
 
@@ -224,13 +394,8 @@ class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        """Validate email exists"""
-        try:
-            user = User.objects.get(email=value.lower())
-            return value.lower()
-        except User.DoesNotExist:
-            # Don't reveal if email exists for security
-            return value.lower()
+        """Normalize email (existence is not revealed)"""
+        return value.lower()
 
 
 class ResetPasswordSerializer(serializers.Serializer):
@@ -261,4 +426,85 @@ class ResetPasswordSerializer(serializers.Serializer):
         except ValidationError as e:
             raise serializers.ValidationError({"new_password": e.messages})
         
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Serializer for token refresh
+    Re-stamps user claims so role and status changes reach new access tokens
+    """
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        """Issue a new access token (and rotated refresh token)"""
+        refresh = self.token_class(attrs['refresh'], check_revoked=False)
+        user = cache.get_user(refresh[api_settings.USER_ID_CLAIM])
+        self.check_user(user, refresh)
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            refresh.rotate()
+        else:
+            refresh.check_blacklist()
+
+        return self.issue_tokens(refresh, user)
+
+    @staticmethod
+    def check_user(user, refresh):
+        """Only active users may refresh, with tokens from the current epoch"""
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(
+                "User not found or inactive.",
+                code="user_inactive"
+            )
+        if token_epoch(refresh) != user.token_epoch:
+            raise AuthenticationFailed(
+                "Token has been revoked.",
+                code="token_revoked"
+            )
+
+    @staticmethod
+    def issue_tokens(refresh, user):
+        """Build the refresh response, rotating the refresh token if enabled"""
+        refresh.set_user_claims(user)
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.renew()
+            data['refresh'] = str(refresh)
+
+        return data
+
+
+class TokenIntrospectionSerializer(serializers.Serializer):
+    """
+    Serializer for token introspection
+    Accepts a single `token` (RFC 7662) or a batch of `tokens`
+    """
+    token = serializers.CharField(required=False)
+    tokens = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        allow_empty=False
+    )
+    token_type_hint = serializers.ChoiceField(
+        choices=TOKEN_TYPE_HINTS,
+        required=False
+    )
+
+    def validate_tokens(self, value):
+        """Cap the batch size"""
+        if len(value) > settings.INTROSPECTION_MAX_BATCH:
+            raise serializers.ValidationError(
+                f"At most {settings.INTROSPECTION_MAX_BATCH} tokens per request."
+            )
+        return value
+
+    def validate(self, attrs):
+        """Require exactly one of token and tokens"""
+        if ('token' in attrs) == ('tokens' in attrs):
+            raise serializers.ValidationError(
+                "Provide either 'token' or 'tokens'."
+            )
+        return attrs
@@ -1,3 +1,1475 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.cache import get_max_age
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.exceptions import TokenBackendError
+import jwt
+
+from .availability import availability_filter, is_taken
+from .bloom import BloomFilter
+from . import cache as user_cache, jobs, keyring, pictures, revocation
+from .admin import UserAdmin
+from .hashing import HashingServiceBusy, hashing_service
+from .login_buffer import login_buffer
+from .password_validation import (
+    HEADER,
+    BreachedPasswordCorpus,
+    BreachedPasswordValidator,
+    password_digest,
+)
+from .models import AdminJob, EmailOutbox, ProfilePicture, RevokedToken, User
+from .throttling import hit
+from .token_cache import VerifiedTokenCache, verified_tokens
+from .utils import NetworkSet, get_client_ip, parse_ip, resolve_client_ip
+
+PASSWORD = 'S3cure-pass!x'
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    PASSWORD_HASHING_WORKERS=0,
+    LOGIN_WRITE_BUFFER_ENABLED=False,
+)
+class APITestCase(TestCase):
+    """Base class: fast inline hashing, empty caches and an API client"""
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        verified_tokens.clear()
+        self.client = APIClient()
+
+    def create_user(self, email='alice@example.com', username='alice', **fields):
+        return User.objects.create_user(
+            email=email,
+            username=username,
+            password=PASSWORD,
+            first_name='Alice',
+            last_name='Liddell',
+            **fields
+        )
+
+    def login(self, email='alice@example.com', password=PASSWORD):
+        self.client.credentials()
+        response = self.client.post(
+            '/api/auth/login/',
+            {'email': email, 'password': password},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['tokens']
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+
+class ClaimChangeTests(APITestCase):
+    """Saving a user revokes tokens whose claims went stale"""
+    def test_deactivated_user_is_rejected(self):
+        user = self.create_user()
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        user.is_active = False
+        user.save()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_demoted_moderator_is_rejected(self):
+        user = self.create_user(role=User.Role.MODERATOR)
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 200)
+
+        user.role = User.Role.USER
+        user.save()
+
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 401)
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 403)
+
+    def test_full_save_keeps_django_semantics(self):
+        user = self.create_user()
+        user.token_epoch = 7
+        user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).token_epoch, 7)
+
+        # A full save of a deleted row inserts it again
+        User.objects.filter(pk=user.pk).delete()
+        user.save()
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+    def test_unrelated_change_keeps_tokens(self):
+        user = self.create_user()
+        self.authenticate(self.login()['access'])
+
+        user.bio = 'Down the rabbit hole'
+        user.save()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+
+class RegistrationHashingTests(APITestCase):
+    """Registration hashes through the hashing pool"""
+    payload = {
+        'email': 'bob@example.com',
+        'username': 'bob',
+        'first_name': 'Bob',
+        'last_name': 'Builder',
+        'password': PASSWORD,
+        'password_confirm': PASSWORD,
+    }
+
+    def test_uses_hashing_service(self):
+        with mock.patch.object(
+            hashing_service, 'make_password', wraps=hashing_service.make_password
+        ) as make_password:
+            response = self.client.post('/api/auth/register/', self.payload, format='json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        make_password.assert_called_once_with(PASSWORD)
+        self.assertTrue(User.objects.get(email='bob@example.com').check_password(PASSWORD))
+
+    def test_busy_pool_rejects_fast(self):
+        with mock.patch.object(hashing_service, 'make_password', side_effect=HashingServiceBusy):
+            response = self.client.post('/api/auth/register/', self.payload, format='json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(email='bob@example.com').exists())
+
+    def test_hashes_in_worker_process(self):
+        with override_settings(PASSWORD_HASHING_WORKERS=1):
+            self.addCleanup(hashing_service.shutdown)
+            encoded = hashing_service.make_password(PASSWORD)
+
+            self.assertIsNotNone(hashing_service._executor)
+            self.assertEqual(hashing_service.check_password(PASSWORD, encoded), (True, False))
+
+
+class DuplicateRegistrationTests(APITestCase):
+    """Duplicates caught by the unique indexes come back as field errors"""
+    payload = RegistrationHashingTests.payload
+
+    def setUp(self):
+        super().setUp()
+        self.create_user('bob@example.com', 'bob')
+
+    def register(self, **fields):
+        return self.client.post('/api/auth/register/', {**self.payload, **fields}, format='json')
+
+    def test_duplicate_email(self):
+        response = self.register(email='Bob@Example.com', username='robert')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_duplicate_username(self):
+        response = self.register(email='robert@example.com')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+
+    def test_case_variant_rejected_by_lower_constraint(self):
+        # bulk_create skips save(), and with it the lowercasing
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.bulk_create([User(email='BOB@example.com', username='robert')])
+
+    def test_email_lookups_use_lower_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.login('Bob@Example.com')
+            self.assertTrue(is_taken('email', 'BOB@example.com'))
+            self.assertEqual(User.objects.get_by_natural_key('BOB@example.com').username, 'bob')
+
+        lookups = [
+            q['sql'].split(' WHERE ', 1)[1] for q in queries
+            if 'FROM "users"' in q['sql'] and ' WHERE ' in q['sql']
+        ]
+        email_lookups = [where for where in lookups if '"email"' in where]
+        self.assertEqual(len(email_lookups), 3)
+        for where in email_lookups:
+            self.assertIn('LOWER("users"."email")', where)
+
+
+class BloomFilterTests(TestCase):
+    def test_count_ignores_repeated_adds(self):
+        bloom = BloomFilter(1000, 0.01)
+        for _ in range(3):
+            for i in range(100):
+                bloom.add(f'key:{i}')
+
+        # Distinct keys only; false positives may hide a few
+        self.assertLessEqual(len(bloom), 100)
+        self.assertGreater(len(bloom), 95)
+        self.assertTrue(all(f'key:{i}' in bloom for i in range(100)))
+
+
+@override_settings(AVAILABILITY_FILTER_ENABLED=True)
+class AvailabilitySyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        availability_filter._bloom = None
+        availability_filter._next_sync = 0.0
+        self.addCleanup(setattr, availability_filter, '_bloom', None)
+
+    def test_sync_picks_up_renames_from_other_processes(self):
+        user = self.create_user()
+        self.assertFalse(is_taken('username', 'alicia'))
+
+        # Another process renames the user: no add_user() in this one
+        User.objects.filter(pk=user.pk).update(username='alicia', updated_at=timezone.now())
+        availability_filter._next_sync = 0.0
+
+        self.assertTrue(is_taken('username', 'alicia'))
+
+
+@override_settings(ADMIN_JOB_CHUNK_SIZE=5)
+class AdminJobTests(APITestCase):
+    def test_demotion_revokes_tokens(self):
+        user = self.create_user(role=User.Role.MODERATOR)
+        self.authenticate(self.login()['access'])
+
+        job = jobs.enqueue('demote_to_user', {'pks': [user.pk]})
+
+        self.assertEqual(job.status, AdminJob.Status.DONE)
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 401)
+
+    def test_filter_selection(self):
+        for i in range(8):
+            self.create_user(f'user{i}@example.com', f'user{i}', is_verified=i % 2 == 0)
+        self.create_user('zed@example.com', 'zed', is_verified=True)
+
+        job = jobs.enqueue('make_inactive', {
+            'filters': {'is_verified__exact': '1'},
+            'search': 'user',
+        })
+        jobs.run(job)
+
+        self.assertEqual(
+            set(User.objects.filter(is_active=False).values_list('username', flat=True)),
+            {'user0', 'user2', 'user4', 'user6'}
+        )
+
+    def test_rejects_unknown_filters(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('make_inactive', {'filters': {'password__startswith': 'pbkdf2'}})
+        with self.assertRaises(ValueError):
+            jobs.enqueue('make_inactive', {})
+
+    def test_inline_run_holds_a_lease(self):
+        user = self.create_user()
+        leases = []
+        run_chunk = jobs.run_chunk
+
+        def spy(job, chunk_size):
+            leases.append(AdminJob.objects.get(pk=job.pk).leased_until)
+            return run_chunk(job, chunk_size)
+
+        with mock.patch.object(jobs, 'run_chunk', spy):
+            jobs.enqueue('make_verified', {'pks': [user.pk]})
+
+        self.assertIsNotNone(leases[0])
+        self.assertGreater(leases[0], timezone.now())
+
+
+@override_settings(LOGIN_LOCKOUT_THRESHOLD=3, LOGIN_LOCKOUT_BASE=30, LOGIN_LOCKOUT_MAX=3600)
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        rates = dict(SimpleRateThrottle.THROTTLE_RATES, login_ip='100/min', login_account='6/min')
+        patcher = mock.patch.object(SimpleRateThrottle, 'THROTTLE_RATES', rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_login(self, email='alice@example.com', password=PASSWORD):
+        return self.client.post(
+            '/api/auth/login/',
+            {'email': email, 'password': password},
+            format='json'
+        )
+
+    def test_hit_counts_only_allowed_requests(self):
+        # Mid-window, so the count stays in one window key
+        with mock.patch('users.throttling.time.time', return_value=6030.0):
+            results = [hit('test', 3, 60)[0] for _ in range(5)]
+            count = caches['ratelimit'].get('test:100')
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(count, 3)
+
+    def test_account_limit(self):
+        self.create_user()
+        for _ in range(6):
+            self.assertEqual(self.post_login().status_code, 200)
+
+        response = self.post_login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Other accounts are unaffected
+        self.assertEqual(self.post_login('bob@example.com').status_code, 400)
+
+    def test_lockout_after_repeated_failures(self):
+        self.create_user()
+        for _ in range(3):
+            self.assertEqual(self.post_login(password='wrong').status_code, 400)
+
+        # Locked out, even with the right password
+        self.assertEqual(self.post_login().status_code, 429)
+
+    def test_success_resets_failures(self):
+        self.create_user()
+        for _ in range(2):
+            self.post_login(password='wrong')
+        self.assertEqual(self.post_login().status_code, 200)
+        for _ in range(2):
+            self.post_login(password='wrong')
+
+        self.assertEqual(self.post_login().status_code, 200)
+
+
+def png_upload(name='picture.png', image=None):
+    image = image or Image.new('RGB', (8, 8), 'red')
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProfileTestCase(APITestCase):
+    """Signed-in user with uploads stored in a temporary MEDIA_ROOT"""
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        patcher = override_settings(MEDIA_ROOT=media_root)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+        self.user = self.create_user()
+        self.authenticate(self.login()['access'])
+
+    def upload(self, upload):
+        return self.client.patch(
+            '/api/auth/profile/', {'profile_picture': upload}, format='multipart'
+        )
+
+
+class ProfileConditionalTests(ProfileTestCase):
+    """Profile ETags: 304 for current copies, 412 for stale writes"""
+    def test_not_modified(self):
+        etag = self.client.get('/api/auth/profile/')['ETag']
+
+        response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_write_is_rejected(self):
+        etag = self.client.get('/api/auth/profile/')['ETag']
+
+        response = self.client.patch(
+            '/api/auth/profile/', {'bio': 'First'}, format='json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.patch(
+            '/api/auth/profile/', {'bio': 'Second'}, format='json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(User.objects.get().bio, 'First')
+
+    def test_picture_is_stored_before_locking(self):
+        calls = []
+        store = pictures.store
+        select_for_update = QuerySet.select_for_update
+
+        def spy_store(*args):
+            calls.append('store')
+            return store(*args)
+
+        def spy_lock(queryset, *args, **kwargs):
+            calls.append('lock')
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(pictures, 'store', spy_store), \
+                mock.patch.object(QuerySet, 'select_for_update', spy_lock):
+            response = self.upload(png_upload())
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(calls, ['store', 'lock'])
+        self.assertTrue(User.objects.get().profile_picture.name.startswith('profile_pics/'))
+
+
+class RefreshRotationTests(APITestCase):
+    """Refresh tokens are single use, with a grace window for parallel refreshes"""
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.refresh = self.login()['refresh']
+
+    def post_refresh(self, refresh):
+        return self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+
+    def test_rotation(self):
+        response = self.post_refresh(self.refresh)
+
+        self.assertEqual(response.status_code, 200)
+        successor = response.json()['refresh']
+        self.assertNotEqual(successor, self.refresh)
+        self.assertEqual(self.post_refresh(successor).status_code, 200)
+
+    def test_reuse_within_grace_is_a_parallel_refresh(self):
+        successor = self.post_refresh(self.refresh).json()['refresh']
+
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        self.assertEqual(self.post_refresh(successor).status_code, 200)
+
+    def test_reuse_after_grace_revokes_the_family(self):
+        successor = self.post_refresh(self.refresh).json()['refresh']
+        RevokedToken.objects.update(revoked_at=timezone.now() - timedelta(minutes=1))
+
+        with self.assertLogs('users.revocation', 'WARNING'):
+            self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+        self.assertEqual(self.post_refresh(successor).status_code, 401)
+        self.assertTrue(RevokedToken.objects.filter(reason=RevokedToken.Reason.REUSED).exists())
+
+    def test_other_sessions_survive_family_revocation(self):
+        other = self.login()['refresh']
+        self.post_refresh(self.refresh)
+        RevokedToken.objects.update(revoked_at=timezone.now() - timedelta(minutes=1))
+        with self.assertLogs('users.revocation', 'WARNING'):
+            self.post_refresh(self.refresh)
+
+        self.assertEqual(self.post_refresh(other).status_code, 200)
+
+
+class RevocationTests(APITestCase):
+    """Bumping the token epoch or changing claims revokes issued tokens"""
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.tokens = self.login()
+
+    def post_refresh(self):
+        return self.client.post(
+            '/api/auth/refresh/', {'refresh': self.tokens['refresh']}, format='json'
+        )
+
+    def test_revoke_tokens(self):
+        self.user.revoke_tokens()
+
+        self.authenticate(self.tokens['access'])
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.post_refresh().status_code, 401)
+
+        # Tokens issued afterwards work
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_demotion_revokes_refresh_tokens(self):
+        self.user.role = User.Role.MODERATOR
+        self.user.save()
+        self.tokens = self.login()
+
+        self.user.role = User.Role.USER
+        self.user.save()
+
+        self.assertEqual(self.post_refresh().status_code, 401)
+
+    def test_granting_changes_keep_sessions(self):
+        self.user.is_verified = True
+        self.user.role = User.Role.ADMIN
+        self.user.save()
+
+        response = self.post_refresh()
+        self.assertEqual(response.status_code, 200)
+        self.authenticate(response.json()['access'])
+        # The refreshed access token carries the new role
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 200)
+
+    def test_deactivated_user_cannot_refresh(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.post_refresh().status_code, 401)
+
+    def test_purge_revoked_tokens(self):
+        now = timezone.now()
+        for jti, expires_at in [('old-1', now - timedelta(days=2)),
+                                ('old-2', now - timedelta(seconds=1)),
+                                ('live', now + timedelta(days=1))]:
+            RevokedToken.objects.create(jti=jti, user=self.user, expires_at=expires_at)
+
+        out = StringIO()
+        call_command('purge_revoked_tokens', batch_size=1, stdout=out)
+
+        self.assertFalse(RevokedToken.objects.filter(jti__startswith='old-').exists())
+        self.assertTrue(RevokedToken.objects.filter(jti='live').exists())
+        self.assertIn('Deleted 2 expired revoked token(s).', out.getvalue())
+
+    def test_warm_builds_filter_at_startup(self):
+        RevokedToken.objects.create(
+            jti='revoked', user=self.user, expires_at=timezone.now() + timedelta(days=1)
+        )
+        with mock.patch.object(revocation, 'revocation_filter', revocation.RevocationFilter()) as bloom:
+            revocation.warm()
+
+            self.assertEqual(bloom.rebuilds, 1)
+            self.assertFalse(bloom.needs_refresh())
+            self.assertTrue(bloom.might_contain('revoked'))
+
+    def test_warm_without_database_defers_to_first_use(self):
+        bloom = revocation.RevocationFilter()
+        with mock.patch.object(revocation, 'revocation_filter', bloom), \
+                mock.patch.object(bloom, 'load_keys', side_effect=DatabaseError('down')), \
+                self.assertLogs('users.revocation', 'WARNING'):
+            revocation.warm()
+
+        self.assertTrue(bloom.needs_refresh())
+
+
+class ClientIPTests(SimpleTestCase):
+    """X-Forwarded-For is only believed for hops added by trusted proxies"""
+    def test_forwarded_for_ignored_without_trusted_proxies(self):
+        self.assertEqual(resolve_client_ip('203.0.113.5', '198.51.100.7'), '203.0.113.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_spoofed_leftmost_entry(self):
+        # The client sent its own X-Forwarded-For; the proxy appended the peer
+        self.assertEqual(
+            resolve_client_ip('10.0.0.1', '6.6.6.6, 198.51.100.7'),
+            '198.51.100.7'
+        )
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8', '172.16.0.0/12'])
+    def test_multi_hop_chain(self):
+        self.assertEqual(
+            resolve_client_ip('10.0.0.1', '6.6.6.6, 198.51.100.7, 172.16.0.5, 10.1.2.3'),
+            '198.51.100.7'
+        )
+        # A chain of proxies only: the left-most hop is the client
+        self.assertEqual(resolve_client_ip('10.0.0.1', '172.16.0.5'), '172.16.0.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_untrusted_peer_is_the_client(self):
+        self.assertEqual(resolve_client_ip('203.0.113.5', '198.51.100.7'), '203.0.113.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_malformed_hop_stops_at_last_trusted_proxy(self):
+        self.assertEqual(resolve_client_ip('10.0.0.1', '198.51.100.7, unknown'), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXIES=['2001:db8::/32', '10.0.0.0/8'])
+    def test_ipv6_and_ipv4_mapped(self):
+        self.assertEqual(
+            resolve_client_ip('2001:db8::1', '2a00:1450::1, 2001:db8::2'),
+            '2a00:1450::1'
+        )
+        # IPv4-mapped peers and hops match IPv4 networks and report as IPv4
+        self.assertEqual(
+            resolve_client_ip('::ffff:10.0.0.1', '::ffff:198.51.100.7'),
+            '198.51.100.7'
+        )
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_hops_with_ports(self):
+        self.assertEqual(resolve_client_ip('10.0.0.1', '198.51.100.7:5123'), '198.51.100.7')
+        self.assertEqual(resolve_client_ip('10.0.0.1', '[2a00:1450::1]:443'), '2a00:1450::1')
+        self.assertEqual(str(parse_ip(' 2a00:1450::1 ')), '2a00:1450::1')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_get_client_ip(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 198.51.100.7'
+        )
+        self.assertEqual(get_client_ip(request), '198.51.100.7')
+
+    def test_network_set(self):
+        networks = NetworkSet(['10.0.0.0/9', '10.128.0.0/9', '192.0.2.1', '2001:db8::/32'])
+
+        self.assertIn(parse_ip('10.255.255.255'), networks)
+        self.assertIn(parse_ip('192.0.2.1'), networks)
+        self.assertNotIn(parse_ip('192.0.2.2'), networks)
+        self.assertNotIn(parse_ip('11.0.0.0'), networks)
+        self.assertIn(parse_ip('2001:db8:ffff::1'), networks)
+        with self.assertRaises(ImproperlyConfigured):
+            NetworkSet(['10.0.0.0/33'])
+
+
+class KeyringTests(APITestCase):
+    """Signing key rotation: kid selection, retired keys and legacy tokens"""
+    payload = {'user_id': 1, 'exp': 4102444800}
+    forging_key = 'not-a-signing-key-but-long-enough-for-hs256'
+
+    def setUp(self):
+        super().setUp()
+        self.keys_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.keys_dir)
+        for kid in ('k1', 'k2'):
+            call_command('generate_signing_key', kid=kid, dir=self.keys_dir, stdout=StringIO())
+
+    def use_key(self, kid, **overrides):
+        patcher = override_settings(JWT_KEYS_DIR=self.keys_dir, JWT_SIGNING_KEY_ID=kid, **overrides)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        return keyring.get_token_backend()
+
+    def test_verification_selected_by_kid(self):
+        token = self.use_key('k1').encode(self.payload)
+        self.assertEqual(jwt.get_unverified_header(token)['kid'], 'k1')
+
+        # Signed by k1, but claiming k2
+        _, body, signature = token.split('.')
+        forged = jwt.encode(self.payload, self.forging_key, headers={'kid': 'k2'}).split('.')[0]
+        with self.assertRaises(TokenBackendError):
+            keyring.get_token_backend().decode(f'{forged}.{body}.{signature}')
+        with self.assertRaises(TokenBackendError):
+            keyring.get_token_backend().decode(
+                jwt.encode(self.payload, self.forging_key, headers={'kid': 'unknown'})
+            )
+
+    def test_retired_key_verifies_until_removed(self):
+        token = self.use_key('k1').encode(self.payload)
+
+        backend = self.use_key('k2')
+        self.assertEqual(jwt.get_unverified_header(backend.encode(self.payload))['kid'], 'k2')
+        self.assertEqual(backend.decode(token)['user_id'], 1)
+
+        # Deleted once the tokens it signed have expired
+        (Path(self.keys_dir) / 'k1.pem').unlink()
+        keyring.reset()
+        with self.assertRaises(TokenBackendError):
+            keyring.get_token_backend().decode(token)
+
+    def test_legacy_tokens(self):
+        legacy = keyring.get_token_backend().encode(self.payload)
+        self.assertNotIn('kid', jwt.get_unverified_header(legacy))
+
+        self.assertEqual(self.use_key('k1').decode(legacy)['user_id'], 1)
+        backend = self.use_key('k1', JWT_ACCEPT_LEGACY_TOKENS=False)
+        with self.assertRaises(TokenBackendError):
+            backend.decode(legacy)
+
+    def test_login_signs_with_active_key(self):
+        self.use_key('k2')
+        self.create_user()
+        access = self.login()['access']
+
+        self.assertEqual(jwt.get_unverified_header(access)['kid'], 'k2')
+        self.authenticate(access)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_jwks(self):
+        self.use_key('k1')
+
+        response = self.client.get('/api/auth/.well-known/jwks.json')
+
+        self.assertEqual(response.status_code, 200)
+        keys = response.json()['keys']
+        self.assertEqual({key['kid'] for key in keys}, {'k1', 'k2'})
+        for key in keys:
+            self.assertEqual((key['alg'], key['use'], key['kty']), ('EdDSA', 'sig', 'OKP'))
+            self.assertNotIn('d', key)
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get(
+            '/api/auth/.well-known/jwks.json', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(INTROSPECTION_CLIENTS={'resource': 'client-secret'}, INTROSPECTION_MAX_AGE=30)
+class IntrospectionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.tokens = self.login()
+        self.client.credentials()
+
+    def introspect(self, data, secret='client-secret'):
+        credentials = base64.b64encode(f'resource:{secret}'.encode()).decode()
+        return self.client.post(
+            '/api/auth/introspect/', data, format='json',
+            HTTP_AUTHORIZATION=f'Basic {credentials}'
+        )
+
+    def test_client_credentials(self):
+        self.assertEqual(self.introspect({'token': 'x'}, secret='wrong').status_code, 401)
+        response = self.client.post('/api/auth/introspect/', {'token': 'x'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_single_token(self):
+        response = self.introspect({'token': self.tokens['access']})
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertTrue(result['active'])
+        self.assertEqual(result['token_type'], 'access_token')
+        self.assertEqual((result['user_id'], result['role']), (self.user.pk, 'user'))
+
+    def test_batch_keeps_request_order(self):
+        response = self.introspect({
+            'tokens': ['garbage', self.tokens['refresh'], self.tokens['access']],
+            'token_type_hint': 'refresh_token',
+        })
+
+        results = response.json()['results']
+        self.assertEqual([result['active'] for result in results], [False, True, True])
+        self.assertEqual(
+            [result['token_type'] for result in results[1:]],
+            ['refresh_token', 'access_token']
+        )
+
+    def test_revoked_tokens_are_inactive(self):
+        self.client.post('/api/auth/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        RevokedToken.objects.update(revoked_at=timezone.now() - timedelta(minutes=1))
+
+        # The rotated refresh token is revoked
+        response = self.introspect({'token': self.tokens['refresh']})
+        self.assertEqual(response.json(), {'active': False})
+
+    def test_epoch_bumped_tokens_are_inactive(self):
+        self.user.revoke_tokens()
+
+        response = self.introspect({'tokens': [self.tokens['access'], self.tokens['refresh']]})
+
+        self.assertEqual(response.json()['results'], [{'active': False}, {'active': False}])
+
+    def test_max_age(self):
+        # Capped by INTROSPECTION_MAX_AGE
+        response = self.introspect({'token': self.tokens['access']})
+        self.assertEqual(get_max_age(response), 30)
+        self.assertIn('private', response['Cache-Control'])
+
+        # Otherwise until the earliest expiry
+        with override_settings(INTROSPECTION_MAX_AGE=10 ** 6):
+            response = self.introspect({'tokens': [self.tokens['refresh'], self.tokens['access']]})
+        lifetime = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()
+        self.assertLessEqual(get_max_age(response), lifetime)
+        self.assertGreater(get_max_age(response), lifetime - 60)
+
+        # Inactive results never change
+        response = self.introspect({'token': 'garbage'})
+        self.assertEqual(get_max_age(response), 30)
+
+
+class OutboxTests(APITestCase):
+    """send_outbox delivers queued emails through the configured backend"""
+    def send_outbox(self, *args):
+        call_command('send_outbox', '--once', *args, stderr=StringIO())
+
+    def queue(self, **fields):
+        return EmailOutbox.objects.create(
+            subject='Hello', body='Body', to_email='alice@example.com', **fields
+        )
+
+    def test_password_reset_is_queued_then_delivered(self):
+        self.create_user()
+        response = self.client.post(
+            '/api/auth/forgot-password/', {'email': 'alice@example.com'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        email = EmailOutbox.objects.get()
+
+        self.send_outbox()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['alice@example.com'])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.SENT, 1))
+        self.assertIsNotNone(email.sent_at)
+
+    def test_not_due_emails_wait(self):
+        self.queue(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.send_outbox()
+
+        self.assertEqual(mail.outbox, [])
+
+    def test_retry_backoff(self):
+        email = self.queue()
+        failing = mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('connection refused')
+        )
+
+        with failing:
+            before = timezone.now()
+            self.send_outbox('--backoff', '30')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.PENDING, 1))
+        self.assertEqual(email.last_error, 'connection refused')
+        self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=30))
+        self.assertLess(email.next_attempt_at, before + timedelta(seconds=60))
+
+        # Doubled after the second failure
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        with failing:
+            before = timezone.now()
+            self.send_outbox('--backoff', '30')
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+        self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=60))
+
+        # Delivered once the backend recovers
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.send_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.SENT, 3))
+        self.assertEqual(email.last_error, '')
+
+    def test_failed_after_max_attempts(self):
+        email = self.queue(attempts=2)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('mailbox unavailable')
+        ):
+            self.send_outbox('--max-attempts', '3')
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.Status.FAILED, 3))
+
+        # Failed emails are not picked up again
+        self.send_outbox()
+        self.assertEqual(mail.outbox, [])
+
+
+class BreachedPasswordTests(SimpleTestCase):
+    """Building the sorted prefix corpus and searching it"""
+    passwords = ['password', 'letmein', 'dragon', 'qwerty', 'monkey', 'sunshine', 'trustno1']
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.output = os.path.join(self.workdir, 'breached.bin')
+
+    def build(self, lines, *args):
+        dump = os.path.join(self.workdir, 'dump.txt')
+        with open(dump, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        call_command(
+            'build_breached_passwords', dump, '--output', self.output, '--run-size', '2', *args,
+            stdout=StringIO(), stderr=StringIO()
+        )
+        corpus = BreachedPasswordCorpus(self.output)
+        self.addCleanup(corpus.close)
+        return corpus
+
+    def records(self, corpus):
+        with open(self.output, 'rb') as f:
+            data = f.read()[HEADER.size:]
+        width = corpus.prefix_bytes
+        return [data[i:i + width] for i in range(0, len(data), width)]
+
+    def test_build_sorts_and_deduplicates(self):
+        lines = [f'{password_digest(p).hex().upper()}:{i + 1}' for i, p in enumerate(self.passwords)]
+        corpus = self.build(lines + lines[:3] + ['not-a-hash', 'ABCD:3'])
+
+        records = self.records(corpus)
+        self.assertEqual(len(corpus), len(self.passwords))
+        self.assertEqual(records, sorted(set(records)))
+        self.assertEqual(records, sorted(password_digest(p)[:8] for p in self.passwords))
+
+    def test_min_count_and_prefix_bytes(self):
+        lines = [f'{password_digest(p).hex()}:{i + 1}' for i, p in enumerate(self.passwords)]
+        corpus = self.build(lines, '--min-count', '3', '--prefix-bytes', '5')
+
+        self.assertEqual(corpus.prefix_bytes, 5)
+        self.assertEqual(len(corpus), len(self.passwords) - 2)
+        self.assertNotIn(password_digest(self.passwords[0]), corpus)
+        self.assertIn(password_digest(self.passwords[2]), corpus)
+
+    def test_search(self):
+        corpus = self.build(self.passwords, '--plaintext')
+        records = self.records(corpus)
+
+        # First and last records, and every one in between
+        self.assertIn(records[0], corpus)
+        self.assertIn(records[-1], corpus)
+        for password in self.passwords:
+            self.assertIn(password_digest(password), corpus)
+
+        # Before the first and after the last record
+        self.assertNotIn(b'\x00' * 20, corpus)
+        self.assertNotIn(b'\xff' * 20, corpus)
+        self.assertNotIn(password_digest('correct horse battery staple'), corpus)
+
+    def test_validator(self):
+        self.build(self.passwords, '--plaintext')
+        validator = BreachedPasswordValidator(self.output)
+
+        with self.assertRaises(ValidationError) as raised:
+            validator.validate('trustno1')
+        self.assertEqual(raised.exception.code, 'password_breached')
+        validator.validate('correct horse battery staple')
+
+    def test_missing_file(self):
+        validator = BreachedPasswordValidator(os.path.join(self.workdir, 'missing.bin'))
+
+        with self.assertRaises(ImproperlyConfigured):
+            validator.validate('trustno1')
+
+    def test_rebuilt_file_is_reopened(self):
+        self.build(['trustno1'], '--plaintext')
+        validator = BreachedPasswordValidator(self.output)
+        validator.validate('dragon')
+
+        self.build(['dragon'], '--plaintext')
+
+        with self.assertRaises(ValidationError):
+            validator.validate('dragon')
+
+
+class BulkImportExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+
+    def write(self, name, lines):
+        path = os.path.join(self.workdir, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def import_users(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_users', path, '--workers', '0', *args, stdout=stdout, stderr=stderr
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def export_users(self, name, *args):
+        path = os.path.join(self.workdir, name)
+        call_command('export_users', '--output', path, *args, stderr=StringIO())
+        with open(path) as f:
+            return f.read()
+
+    def test_import_deduplicates(self):
+        self.create_user('taken@example.com', 'taken')
+        path = self.write('users.csv', [
+            'email,username,first_name,last_name,role',
+            'one@example.com,one,One,Row,user',
+            'ONE@example.com,uno,Dup,Email,user',
+            'two@example.com,one,Dup,Username,user',
+            'taken@example.com,new,Existing,Email,user',
+            'three@example.com,three,Three,Row,admin',
+            'bad-email,four,Bad,Row,user',
+            'five@example.com,five,Bad,Role,overlord',
+        ])
+
+        stdout, stderr = self.import_users(path, '--batch-size', '3')
+
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'taken', 'one', 'three'}
+        )
+        self.assertEqual(User.objects.get(username='three').role, User.Role.ADMIN)
+        self.assertIn('Imported 2 user(s), skipped 3 existing, 2 invalid row(s)', stdout)
+        self.assertIn('Line 7: email:', stderr)
+        self.assertIn('Line 8: role:', stderr)
+
+    def test_import_passwords(self):
+        encoded = make_password('Imported-pass!1')
+        names = {'first_name': 'Im', 'last_name': 'Ported'}
+        path = self.write('users.jsonl', [
+            json.dumps({
+                **names, 'email': 'plain@example.com', 'username': 'plain', 'password': PASSWORD
+            }),
+            json.dumps({
+                **names, 'email': 'hashed@example.com', 'username': 'hashed', 'password_hash': encoded
+            }),
+            json.dumps({**names, 'email': 'none@example.com', 'username': 'none'}),
+            json.dumps({**names, 'email': 'bad@example.com', 'username': 'bad', 'password_hash': 'nope'}),
+            'not json',
+        ])
+
+        _, stderr = self.import_users(path)
+
+        plain = User.objects.get(username='plain')
+        self.assertNotEqual(plain.password, PASSWORD)
+        self.assertTrue(plain.check_password(PASSWORD))
+        hashed = User.objects.get(username='hashed')
+        self.assertEqual(hashed.password, encoded)
+        self.assertTrue(hashed.check_password('Imported-pass!1'))
+        self.assertFalse(User.objects.get(username='none').has_usable_password())
+        self.assertFalse(User.objects.filter(username='bad').exists())
+        self.assertIn('Line 4: password_hash: Unknown password hash format.', stderr)
+        self.assertIn('Line 5:', stderr)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write('users.csv', [
+            'email,username,first_name,last_name', 'one@example.com,one,One,Row'
+        ])
+
+        stdout, _ = self.import_users(path, '--dry-run')
+
+        self.assertIn('Validated 1 user(s)', stdout)
+        self.assertFalse(User.objects.exists())
+
+    def test_export_streams_every_row(self):
+        for i in range(7):
+            self.create_user(f'user{i}@example.com', f'user{i}', is_active=i != 3)
+
+        exported = self.export_users('users.jsonl', '--chunk-size', '3')
+        rows = [json.loads(line) for line in exported.splitlines()]
+        self.assertEqual([row['username'] for row in rows], [f'user{i}' for i in range(7)])
+        self.assertNotIn('password_hash', rows[0])
+
+        active = self.export_users('active.csv', '--chunk-size', '2', '--active-only').splitlines()
+        self.assertEqual(active[0].split(',')[:2], ['email', 'username'])
+        self.assertEqual(len(active), 1 + 6)
+
+    def test_round_trip_keeps_passwords(self):
+        for i in range(5):
+            self.create_user(f'user{i}@example.com', f'user{i}')
+        exported = self.export_users(
+            'users.csv', '--chunk-size', '2', '--include-password-hashes'
+        ).splitlines()
+        User.objects.all().delete()
+
+        self.import_users(self.write('again.csv', exported), '--batch-size', '2')
+
+        self.assertEqual(User.objects.count(), 5)
+        self.assertTrue(User.objects.get(username='user4').check_password(PASSWORD))
+
+
+@override_settings(PROFILE_PICTURE_SIZES=(16, 32))
+class ProfilePictureTests(ProfileTestCase):
+    def noise(self, size):
+        return Image.frombytes('RGB', (size, size), os.urandom(size * size * 3))
+
+    def process_pictures(self):
+        call_command('process_profile_pictures', '--once', stdout=StringIO(), stderr=StringIO())
+
+    @override_settings(PROFILE_PICTURE_MAX_SIZE=4096)
+    def test_size_limit(self):
+        # Refused while streaming in, and from Content-Length alone
+        for size in (64, 256):
+            response = self.upload(png_upload(image=self.noise(size)))
+            self.assertEqual(response.status_code, 413)
+            self.assertIn('profile_picture', response.json())
+        self.assertFalse(ProfilePicture.objects.exists())
+
+        self.assertEqual(self.upload(png_upload()).status_code, 200)
+
+    def test_rejects_non_images(self):
+        upload = SimpleUploadedFile('notes.png', b'not an image', content_type='image/png')
+
+        response = self.upload(upload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('profile_picture', response.json())
+
+    def test_deduplicated_by_content_hash(self):
+        image = self.noise(8)
+        self.assertEqual(self.upload(png_upload('mine.png', image)).status_code, 200)
+        other = self.create_user('bob@example.com', 'bob')
+        self.authenticate(self.login('bob@example.com')['access'])
+        self.assertEqual(self.upload(png_upload('same.png', image)).status_code, 200)
+
+        picture = ProfilePicture.objects.get()
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.profile_picture.name, picture.original.name)
+        self.assertEqual(other.profile_picture.name, picture.original.name)
+        stored = os.listdir(os.path.dirname(picture.original.path))
+        self.assertEqual(stored, [os.path.basename(picture.original.name)])
+
+    def test_thumbnails_are_generated_and_published(self):
+        response = self.upload(png_upload(image=self.noise(48)))
+        etag = response['ETag']
+        self.assertEqual(response.json()['profile_picture_thumbnails'], {})
+
+        self.process_pictures()
+
+        picture = ProfilePicture.objects.get()
+        self.assertEqual(picture.status, ProfilePicture.Status.READY)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_thumbnails, picture.thumbnails)
+        for size, name in picture.thumbnails.items():
+            with Image.open(os.path.join(settings.MEDIA_ROOT, name)) as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (int(size), int(size))))
+
+        response = self.client.get('/api/auth/profile/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(set(response.json()['profile_picture_thumbnails']), {'16', '32'})
+
+    def test_reupload_of_processed_picture_is_published_at_once(self):
+        image = self.noise(8)
+        self.upload(png_upload(image=image))
+        self.process_pictures()
+        self.client.patch('/api/auth/profile/', {'profile_picture': None}, format='json')
+        self.assertEqual(self.client.get('/api/auth/profile/').json()['profile_picture_thumbnails'], {})
+
+        response = self.upload(png_upload(image=image))
+
+        self.assertEqual(set(response.json()['profile_picture_thumbnails']), {'16', '32'})
+
+
+class VerifiedTokenCacheTests(APITestCase):
+    def validator(self, exp):
+        calls = []
+
+        def validate(raw_token):
+            calls.append(raw_token)
+            return {'exp': exp, 'raw': raw_token}
+        return validate, calls
+
+    def test_lru_eviction(self):
+        tokens = VerifiedTokenCache(2)
+        validate, calls = self.validator(time.time() + 60)
+
+        for raw_token in (b'a', b'b', b'a', b'c', b'a', b'b'):
+            tokens.get_or_validate(raw_token, validate)
+
+        # b was least recently used when c arrived
+        self.assertEqual(calls, [b'a', b'b', b'c', b'b'])
+        self.assertEqual(len(tokens), 2)
+        self.assertEqual((tokens.hits, tokens.misses), (2, 4))
+
+    def test_entries_expire_at_token_exp(self):
+        tokens = VerifiedTokenCache(10)
+        validate, calls = self.validator(1000.0)
+
+        with mock.patch('users.token_cache.time.time', return_value=999.0):
+            tokens.get_or_validate(b'a', validate)
+            tokens.get_or_validate(b'a', validate)
+        with mock.patch('users.token_cache.time.time', return_value=1000.0):
+            tokens.get_or_validate(b'a', validate)
+
+        self.assertEqual(calls, [b'a', b'a'])
+
+    def test_invalid_tokens_and_disabled_cache(self):
+        tokens = VerifiedTokenCache(10)
+        with self.assertRaises(ValueError):
+            tokens.get_or_validate(b'bad', mock.Mock(side_effect=ValueError))
+        self.assertEqual(len(tokens), 0)
+
+        tokens = VerifiedTokenCache(0)
+        validate, calls = self.validator(time.time() + 60)
+        tokens.get_or_validate(b'a', validate)
+        tokens.get_or_validate(b'a', validate)
+        self.assertEqual(calls, [b'a', b'a'])
+
+    def test_cached_token_still_checks_revocation(self):
+        user = self.create_user()
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.assertGreaterEqual(verified_tokens.hits, 1)
+
+        user.revoke_tokens()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_cached_token_of_deactivated_user(self):
+        user = self.create_user()
+        self.authenticate(self.login()['access'])
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        user.is_active = False
+        user.save()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+class UserDirectoryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_user('mod@example.com', 'mod', role=User.Role.MODERATOR)
+        for i in range(10):
+            self.create_user(
+                f'user{i}@example.com', f'user{i}',
+                role=User.Role.ADMIN if i % 3 == 0 else User.Role.USER,
+                is_verified=i % 2 == 0,
+            )
+        # Ties on created_at are broken by id
+        tied = User.objects.filter(username__in=['user3', 'user4', 'user5', 'user6'])
+        tied.update(created_at=timezone.now())
+        self.authenticate(self.login('mod@example.com')['access'])
+
+    def expected(self, queryset=None):
+        queryset = User.objects.all() if queryset is None else queryset
+        return list(queryset.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url):
+        """Follow next links; returns the ids seen and the responses"""
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.json())
+            ids += [row['id'] for row in pages[-1]['results']]
+            url = pages[-1]['next']
+        return ids, pages
+
+    def test_cursor_round_trip(self):
+        ids, pages = self.walk('/api/auth/users/?page_size=4')
+
+        self.assertEqual(ids, self.expected())
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+
+        # Back from the last page
+        response = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual([row['id'] for row in response['results']], ids[4:8])
+        response = self.client.get(response['previous']).json()
+        self.assertEqual([row['id'] for row in response['results']], ids[:4])
+        self.assertIsNone(response['previous'])
+
+    def test_fields(self):
+        response = self.client.get('/api/auth/users/?fields=id,full_name')
+
+        self.assertEqual(response.status_code, 200)
+        first = response.json()['results'][0]
+        self.assertEqual(set(first), {'id', 'full_name'})
+        self.assertEqual(first['full_name'], 'Alice Liddell')
+
+        response = self.client.get('/api/auth/users/?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_filters(self):
+        ids, _ = self.walk('/api/auth/users/?role=admin&is_verified=true&page_size=1')
+        self.assertEqual(ids, self.expected(User.objects.filter(role='admin', is_verified=True)))
+
+        ids, _ = self.walk('/api/auth/users/?search=USER1')
+        self.assertEqual(ids, self.expected(User.objects.filter(username='user1')))
+
+        self.assertEqual(self.client.get('/api/auth/users/?role=root').status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/users/?is_active=maybe').status_code, 400)
+
+    def test_tampered_cursor(self):
+        for cursor in ('garbage', 'bm90fGF8Y3Vyc29y', '%%%'):
+            response = self.client.get(f'/api/auth/users/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+    def test_requires_moderator(self):
+        self.authenticate(self.login('user1@example.com')['access'])
+
+        self.assertEqual(self.client.get('/api/auth/users/').status_code, 403)
+
+
+@mock.patch.object(UserAdmin, 'list_per_page', 3)
+class UserChangeListTests(APITestCase):
+    """Admin changelist: keyset pages in the default order, numbered otherwise"""
+    url = '/admin/users/user/'
+
+    def setUp(self):
+        super().setUp()
+        admin_user = self.create_user('admin@example.com', 'admin', is_staff=True, is_superuser=True)
+        for i in range(7):
+            self.create_user(f'user{i}@example.com', f'user{i}')
+        User.objects.filter(username__in=['user2', 'user3', 'user4']).update(created_at=timezone.now())
+        self.client.force_login(admin_user)
+
+    def changelist(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_keyset_pages(self):
+        seen = []
+        cl = self.changelist()
+        while True:
+            self.assertTrue(cl.keyset)
+            self.assertEqual(cl.result_count, 8)
+            self.assertFalse(cl.result_count_is_estimate)
+            seen += [user.pk for user in cl.result_list]
+            if not cl.next_page_url:
+                break
+            cl = self.changelist(cl.next_page_url)
+
+        self.assertEqual(
+            seen,
+            list(User.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        )
+
+    def test_next_link_is_rendered(self):
+        response = self.client.get(self.url)
+
+        self.assertContains(response, response.context['cl'].next_page_url.replace('&', '&amp;'))
+
+    def test_sorting_uses_numbered_pages(self):
+        cl = self.changelist('?o=2')
+
+        self.assertFalse(cl.keyset)
+        self.assertEqual(cl.paginator.num_pages, 3)
+        self.assertEqual(
+            [user.username for user in cl.result_list],
+            ['admin', 'user0', 'user1']
+        )
+        cl = self.changelist('?o=2&p=2')
+        self.assertEqual([user.username for user in cl.result_list], ['user2', 'user3', 'user4'])
+
+    def test_search_keeps_cursor_filters(self):
+        for i in range(10, 14):
+            self.create_user(f'user{i}@example.com', f'user{i}')
+
+        cl = self.changelist('?q=user1')
+        seen = [user.username for user in cl.result_list]
+        self.assertIn('q=user1', cl.next_page_url)
+        seen += [user.username for user in self.changelist(cl.next_page_url).result_list]
+
+        self.assertEqual(sorted(seen), ['user1', 'user10', 'user11', 'user12', 'user13'])
+
+    def test_bad_cursor_redirects(self):
+        response = self.client.get(self.url + '?after=not-a-cursor')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('e=1', response['Location'])
+
+
+class UserCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.key = f'user:{self.user.pk}'
+
+    def test_read_through(self):
+        user_cache.get_user(self.user.pk)
+        user_cache.get_token_epoch(self.user.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cache.get_user(self.user.pk).email, 'alice@example.com')
+            self.assertEqual(user_cache.get_token_epoch(self.user.pk), 0)
+
+    def test_save_invalidates_again_on_commit(self):
+        user_cache.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.bio = 'Committed'
+                self.user.save()
+                self.assertIsNone(caches['users'].get(self.key))
+                # A concurrent reader re-caches the row before the commit
+                caches['users'].set(self.key, User.objects.get(pk=self.user.pk))
+
+        self.assertIsNone(caches['users'].get(self.key))
+        self.assertEqual(user_cache.get_user(self.user.pk).bio, 'Committed')
+
+    def test_rollback_leaves_cache_alone(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.user.bio = 'Rolled back'
+                    self.user.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            # Cached from the committed row after the rollback
+            user_cache.get_user(self.user.pk)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(caches['users'].get(self.key).bio, '')
+        self.assertEqual(user_cache.get_user(self.user.pk).bio, '')
+
+    def test_delete_invalidates(self):
+        user_cache.get_user(self.user.pk)
+
+        self.user.delete()
+
+        self.assertIsNone(user_cache.get_user(self.user.pk))
+        self.assertIsNone(user_cache.get_token_epoch(self.user.pk))
+
+
+@override_settings(
+    LOGIN_WRITE_BUFFER_ENABLED=True,
+    LOGIN_WRITE_BUFFER_SIZE=3,
+    LOGIN_WRITE_BUFFER_INTERVAL=5.0,
+)
+class LoginBufferTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            self.create_user(email=f'user{i}@example.com', username=f'user{i}')
+            for i in range(3)
+        ]
+        self.timers = []
+        patcher = mock.patch('users.login_buffer.threading.Timer', side_effect=self.fake_timer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(login_buffer.flush)
+
+    def fake_timer(self, interval, function):
+        timer = mock.Mock(interval=interval, function=function)
+        self.timers.append(timer)
+        return timer
+
+    def last_login_ips(self):
+        return dict(User.objects.values_list('email', 'last_login_ip'))
+
+    def test_logins_are_queued_until_flush(self):
+        self.users[0].record_login('10.0.0.1')
+
+        self.assertIsNone(User.objects.get(pk=self.users[0].pk).last_login)
+        self.assertEqual(len(self.timers), 1)
+        self.assertEqual(self.timers[0].interval, 5.0)
+        self.timers[0].start.assert_called_once()
+
+    def test_repeated_logins_merge_into_one_update(self):
+        self.users[0].record_login('10.0.0.1')
+        self.users[0].record_login('10.0.0.2')
+        self.users[1].record_login('10.0.0.3')
+
+        with self.assertNumQueries(1):
+            updated = login_buffer.flush()
+
+        self.assertEqual(updated, 2)
+        ips = self.last_login_ips()
+        self.assertEqual(ips['user0@example.com'], '10.0.0.2')
+        self.assertEqual(ips['user1@example.com'], '10.0.0.3')
+        self.assertIsNone(ips['user2@example.com'])
+        self.timers[0].cancel.assert_called_once()
+
+    def test_flushes_when_batch_is_full(self):
+        self.users[0].record_login('10.0.0.1')
+        self.users[1].record_login('10.0.0.2')
+        self.assertIsNone(self.last_login_ips()['user1@example.com'])
+
+        self.users[2].record_login('10.0.0.3')
+
+        ips = self.last_login_ips()
+        self.assertEqual(ips['user0@example.com'], '10.0.0.1')
+        self.assertEqual(ips['user2@example.com'], '10.0.0.3')
+        self.assertEqual(len(self.timers), 1)
+        self.timers[0].cancel.assert_called_once()
+        self.assertEqual(login_buffer.flush(), 0)
+
+    def test_timer_flushes_after_interval(self):
+        user_cache.get_user(self.users[0].pk)
+        self.users[0].record_login('10.0.0.1')
+
+        # The timer thread closes its own connection; keep the test's open
+        with mock.patch('users.login_buffer.connection'):
+            self.timers[0].function()
+
+        self.assertEqual(self.last_login_ips()['user0@example.com'], '10.0.0.1')
+        self.assertEqual(user_cache.get_user(self.users[0].pk).last_login_ip, '10.0.0.1')
+
+        # The next login after a flush arms a fresh timer
+        self.users[1].record_login('10.0.0.2')
+        self.assertEqual(len(self.timers), 2)
@@ -0,0 +1,191 @@
+"""
+Login Rate Limiting
+Sliding-window rate limits and exponential lockout kept in atomic cache
+counters, so rejected requests never reach the password hasher or database
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+from .utils import get_client_ip
+
+RATE_LIMIT_CACHE_ALIAS = 'ratelimit'
+
+
+def _cache():
+    return caches[RATE_LIMIT_CACHE_ALIAS]
+
+
+def _incr(cache, key, timeout):
+    """Atomically increment a counter, creating it if needed; the new value"""
+    if cache.add(key, 1, timeout=timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout=timeout)
+        return 1
+
+
+def hit(key, limit, window):
+    """
+    Count a request against a sliding window of `window` seconds.
+    The window is approximated from the current and previous fixed windows,
+    weighting the previous one by how much of it still overlaps. Returns
+    (allowed, seconds to wait); rejected requests are not counted.
+    """
+    cache = _cache()
+    now = time.time()
+    index, elapsed = divmod(now, window)
+    current_key = f'{key}:{int(index)}'
+    previous_key = f'{key}:{int(index) - 1}'
+
+    # Count first and decide on the value incr() returned, so concurrent
+    # workers can never all read the same count and pass the limit together
+    current = _incr(cache, current_key, 2 * window) - 1
+    previous = cache.get(previous_key, 0)
+    overlap = 1 - elapsed / window
+
+    if previous * overlap + current >= limit:
+        try:
+            cache.decr(current_key)
+        except ValueError:
+            pass
+        if current >= limit:
+            # Wait for the next window, then for this one to fade out enough
+            wait = (window - elapsed) + window * (1 - limit / current)
+        else:
+            wait = window * (1 - (limit - current) / previous) - elapsed
+        return False, max(wait, 1)
+    return True, None
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    DRF throttle using an atomic sliding-window counter in the rate limit
+    cache instead of a cached list of request timestamps.
+    Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+    """
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        allowed, self._wait = hit(key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class ClientIPThrottle(SlidingWindowThrottle):
+    """Limit requests per client IP"""
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': get_client_ip(request)
+        }
+
+
+class AccountThrottle(SlidingWindowThrottle):
+    """Limit requests per target account (the submitted email)"""
+    def get_cache_key(self, request, view):
+        email = account_ident(request)
+        if not email:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email}
+
+
+class LoginIPThrottle(ClientIPThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(AccountThrottle):
+    scope = 'login_account'
+
+
+class PasswordResetIPThrottle(ClientIPThrottle):
+    scope = 'password_reset_ip'
+
+
+class PasswordResetAccountThrottle(AccountThrottle):
+    scope = 'password_reset_account'
+
+
+class AvailabilityIPThrottle(ClientIPThrottle):
+    scope = 'availability'
+
+
+def account_ident(request):
+    """Normalized email submitted with the request, if any"""
+    email = request.data.get('email')
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+
+def lockout_ident(request):
+    """Lockouts apply to an account and client IP pair"""
+    email = account_ident(request)
+    if not email:
+        return None
+    return f'{email}|{get_client_ip(request)}'
+
+
+class Lockout:
+    """
+    Exponential lockout after repeated login failures.
+    From LOGIN_LOCKOUT_THRESHOLD consecutive failures on, each failure locks
+    the account and IP pair for LOGIN_LOCKOUT_BASE seconds, doubling per
+    further failure up to LOGIN_LOCKOUT_MAX. A success clears the count.
+    """
+    def _keys(self, ident):
+        return f'lockout:failures:{ident}', f'lockout:until:{ident}'
+
+    def locked_for(self, ident):
+        """Seconds the ident remains locked out (0 if not locked)"""
+        _, until_key = self._keys(ident)
+        until = _cache().get(until_key)
+        if until is None:
+            return 0
+        return max(until - time.time(), 0)
+
+    def record_failure(self, ident):
+        cache = _cache()
+        failures_key, until_key = self._keys(ident)
+        failures = _incr(cache, failures_key, settings.LOGIN_LOCKOUT_MAX * 2)
+
+        excess = failures - settings.LOGIN_LOCKOUT_THRESHOLD
+        if excess >= 0:
+            duration = min(
+                settings.LOGIN_LOCKOUT_BASE * 2 ** min(excess, 32),
+                settings.LOGIN_LOCKOUT_MAX
+            )
+            cache.set(until_key, time.time() + duration, timeout=duration)
+
+    def reset(self, ident):
+        _cache().delete_many(self._keys(ident))
+
+
+lockout = Lockout()
+
+
+class LoginLockoutThrottle(BaseThrottle):
+    """Reject logins for an account and IP pair that is locked out"""
+    def allow_request(self, request, view):
+        ident = lockout_ident(request)
+        self._wait = lockout.locked_for(ident) if ident else 0
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+LOGIN_THROTTLES = [LoginLockoutThrottle, LoginIPThrottle, LoginAccountThrottle]
+PASSWORD_RESET_THROTTLES = [PasswordResetIPThrottle, PasswordResetAccountThrottle]
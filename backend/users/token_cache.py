@@ -0,0 +1,79 @@
+"""
+Verified Access Token Cache
+Per-process LRU of access tokens that already passed signature and claim
+validation, so repeat requests with the same token skip decoding
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of validated tokens keyed by a digest of the raw token.
+    Entries expire at the token's exp claim; a size of 0 disables caching.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_validate(self, raw_token, validate):
+        """Return the cached token for raw_token, or validate and cache it"""
+        if not self.maxsize:
+            return validate(raw_token)
+
+        key = hashlib.blake2b(raw_token, digest_size=16).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return token
+                del self._entries[key]
+            self.misses += 1
+
+        # Invalid tokens raise here and are never cached
+        token = validate(raw_token)
+
+        with self._lock:
+            self._entries[key] = (token, token['exp'])
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return token
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+verified_tokens = VerifiedTokenCache(settings.ACCESS_TOKEN_CACHE_SIZE)
+
+
+def reset(**kwargs):
+    """Drop cached tokens when the settings they were validated under change"""
+    if kwargs.get('setting') in (
+        'ACCESS_TOKEN_CACHE_SIZE',
+        'JWT_KEYS_DIR',
+        'JWT_SIGNING_KEY_ID',
+        'JWT_ACCEPT_LEGACY_TOKENS',
+        'SIMPLE_JWT',
+    ):
+        verified_tokens.maxsize = settings.ACCESS_TOKEN_CACHE_SIZE
+        verified_tokens.clear()
+
+
+setting_changed.connect(reset)
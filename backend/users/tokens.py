@@ -0,0 +1,120 @@
+"""
+JWT Token Classes
+Embeds user claims at issue time so requests can be authenticated statelessly
+"""
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import keyring, revocation
+
+
+# User attributes copied into every issued token
+USER_CLAIMS = ('email', 'role', 'is_active', 'is_verified', 'token_epoch')
+
+# ID of the login session a refresh token was rotated from
+FAMILY_CLAIM = 'fam'
+
+
+def token_epoch(token):
+    """Token epoch a token was issued in (tokens predating epochs are in 0)"""
+    return token.get('token_epoch', 0)
+
+
+class KeyringTokenMixin:
+    """Sign and verify through the users app signing keyring"""
+    def get_token_backend(self):
+        return keyring.get_token_backend()
+
+
+class UserAccessToken(KeyringTokenMixin, AccessToken):
+    """
+    Access token signed with the active keyring key
+    """
+
+
+class UserRefreshToken(KeyringTokenMixin, RefreshToken):
+    """
+    Refresh token carrying the user's role and status claims.
+    Access tokens derived from it inherit the same claims. Every token
+    carries the family (login session) it was rotated from, and revocation
+    of the token or its family is checked against the revocation store.
+    """
+    access_token_class = UserAccessToken
+
+    def __init__(self, token=None, verify=True, check_revoked=True):
+        # check_revoked=False still verifies the signature and claims but
+        # leaves the revocation lookup to the caller (rotation, async views)
+        self.check_revoked = check_revoked
+        super().__init__(token, verify=verify)
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[FAMILY_CLAIM] = uuid4().hex
+        token.set_user_claims(user)
+        return token
+
+    def set_user_claims(self, user):
+        """Stamp the current state of the user into the token"""
+        for claim in USER_CLAIMS:
+            self[claim] = getattr(user, claim)
+
+    @property
+    def family(self):
+        return self.get(FAMILY_CLAIM)
+
+    def verify(self, *args, **kwargs):
+        # Expiry and claim checks first so expired tokens never hit the store
+        super().verify(*args, **kwargs)
+        if self.check_revoked:
+            self.check_blacklist()
+
+    def check_family(self):
+        """Raise TokenError if this token's family has been revoked"""
+        if self.family and revocation.is_revoked(self.family):
+            raise TokenError("Token is blacklisted")
+
+    def check_blacklist(self):
+        """Raise TokenError if this token or its family has been revoked"""
+        if revocation.is_revoked(self[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+        self.check_family()
+
+    async def acheck_blacklist(self):
+        """Async variant of check_blacklist"""
+        if await revocation.ais_revoked(self[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+        if self.family and await revocation.ais_revoked(self.family):
+            raise TokenError("Token is blacklisted")
+
+    def rotate(self):
+        """
+        Revoke this token in exchange for a successor.
+        Raises TokenError if the family is revoked or the token was reused.
+        """
+        self.check_family()
+        revocation.rotate(self)
+
+    async def arotate(self):
+        """Async variant of rotate (rotation runs in a transaction)"""
+        await sync_to_async(self.rotate)()
+
+    def renew(self):
+        """Turn this token into its successor in the same family"""
+        if FAMILY_CLAIM not in self:
+            self[FAMILY_CLAIM] = uuid4().hex
+        self.set_jti()
+        self.set_exp()
+        self.set_iat()
+
+    def blacklist(self):
+        """Revoke this token"""
+        revocation.revoke(self)
+
+    async def ablacklist(self):
+        """Async variant of blacklist"""
+        await revocation.arevoke(self)
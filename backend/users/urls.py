@@ -10,18 +10,26 @@ app_name = 'users'
 urlpatterns = [
     # Authentication endpoints
     path('register/', views.UserRegistrationView.as_view(), name='register'),
+    path('availability/', views.AvailabilityView.as_view(), name='availability'),
     path('login/', views.UserLoginView.as_view(), name='login'),
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
     path('refresh/', views.CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('introspect/', views.TokenIntrospectionView.as_view(), name='token_introspect'),
     
     # Profile management
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     path('change-password/', views.PasswordChangeView.as_view(), name='change_password'),
     
+    # User directory (moderators and admins)
+    path('users/', views.UserDirectoryView.as_view(), name='user_directory'),
+    
     # Password reset
     path('forgot-password/', views.ForgotPasswordView.as_view(), name='forgot_password'),
     path('reset-password/', views.ResetPasswordView.as_view(), name='reset_password'),
     
+    # Public signing keys
+    path('.well-known/jwks.json', views.jwks, name='jwks'),
+    
     # Health check
     path('health/', views.health_check, name='health_check'),
 ]
\ No newline at end of file
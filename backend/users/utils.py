@@ -0,0 +1,170 @@
+"""
+Request Utilities
+Helpers shared by the sync views, async views and throttles
+"""
+import hashlib
+import ipaddress
+from bisect import bisect_right
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# request.META key the resolved client IP is cached under; META is shared by
+# DRF requests and the Django request they wrap
+CLIENT_IP_META_KEY = 'users.client_ip'
+
+
+class NetworkSet:
+    """
+    Set of IP networks compiled into merged, sorted integer ranges per IP
+    version, so membership is a binary search
+    """
+    def __init__(self, networks):
+        ranges = {4: [], 6: []}
+        for network in networks:
+            try:
+                network = ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                raise ImproperlyConfigured(f"Invalid TRUSTED_PROXIES entry: {network!r}")
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+        self._starts = {}
+        self._ends = {}
+        for version, version_ranges in ranges.items():
+            merged = []
+            for start, end in sorted(version_ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __contains__(self, ip):
+        starts = self._starts[ip.version]
+        index = bisect_right(starts, int(ip)) - 1
+        return index >= 0 and int(ip) <= self._ends[ip.version][index]
+
+
+_trusted_proxies = None
+
+
+def trusted_proxies():
+    """TRUSTED_PROXIES compiled once per process"""
+    global _trusted_proxies
+    if _trusted_proxies is None:
+        _trusted_proxies = NetworkSet(settings.TRUSTED_PROXIES)
+    return _trusted_proxies
+
+
+def _reset_trusted_proxies(**kwargs):
+    global _trusted_proxies
+    if kwargs.get('setting') == 'TRUSTED_PROXIES':
+        _trusted_proxies = None
+
+
+setting_changed.connect(_reset_trusted_proxies)
+
+
+def parse_ip(value):
+    """Parse an address from REMOTE_ADDR or an X-Forwarded-For hop, or None"""
+    value = value.strip()
+    if value.startswith('['):
+        # [IPv6]:port
+        value = value[1:].partition(']')[0]
+    elif value.count(':') == 1:
+        # IPv4:port
+        value = value.partition(':')[0]
+
+    try:
+        ip = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if ip.version == 6 and ip.ipv4_mapped:
+        return ip.ipv4_mapped
+    return ip
+
+
+def resolve_client_ip(remote_addr, forwarded_for):
+    """
+    Walk from the connecting peer back through X-Forwarded-For (right to
+    left) while hops are trusted proxies; the first untrusted hop is the
+    client. Malformed hops stop the walk at the last proxy we trust.
+    """
+    ip = parse_ip(remote_addr or '')
+    if ip is None:
+        return remote_addr or None
+
+    proxies = trusted_proxies()
+    if forwarded_for:
+        for hop in reversed(forwarded_for.split(',')):
+            if ip not in proxies:
+                break
+            hop_ip = parse_ip(hop)
+            if hop_ip is None:
+                break
+            ip = hop_ip
+    return str(ip)
+
+
+def get_client_ip(request):
+    """Get client IP address from request, resolved once per request"""
+    ip = request.META.get(CLIENT_IP_META_KEY)
+    if ip is None:
+        ip = resolve_client_ip(
+            request.META.get('REMOTE_ADDR'),
+            request.META.get('HTTP_X_FORWARDED_FOR')
+        )
+        request.META[CLIENT_IP_META_KEY] = ip
+    return ip
+
+
+def _profile_versions(user):
+    """
+    Everything the profile representation changes with: updated_at covers
+    edits, last_login is written without touching it, and age moves with
+    the date
+    """
+    versions = [user.updated_at, user.last_login]
+    if user.date_of_birth:
+        versions.append(datetime.combine(timezone.now().date(), time.min, dt_timezone.utc))
+    return [version for version in versions if version]
+
+
+def profile_etag(user):
+    """Quoted ETag of a user's profile, computed without serializing it"""
+    version = ':'.join([str(user.pk), *(v.isoformat() for v in _profile_versions(user))])
+    return quote_etag(hashlib.sha256(version.encode()).hexdigest()[:32])
+
+
+def profile_last_modified(user):
+    """Unix timestamp of the latest change to a user's profile"""
+    return int(max(_profile_versions(user)).timestamp())
+
+
+def profile_preconditions(request, user):
+    """
+    Evaluate conditional request headers against the user's profile:
+    304 when a GET's copy is current, 412 when a write's copy is stale,
+    None to go ahead
+    """
+    return get_conditional_response(
+        request,
+        etag=profile_etag(user),
+        last_modified=profile_last_modified(user)
+    )
+
+
+def set_profile_validators(response, user):
+    """Attach ETag/Last-Modified and make clients revalidate every time"""
+    response['ETag'] = profile_etag(user)
+    response['Last-Modified'] = http_date(profile_last_modified(user))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -2,43 +2,60 @@
 Authentication API Views using Django REST Framework
 Handles registration, login, profile management, and password reset
 """
-from rest_framework import status, generics, permissions
+from rest_framework import status, generics, permissions, serializers
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth.tokens import default_token_generator
-from django.contrib.auth import login
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.template.loader import render_to_string
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 import logging
 
-from .models import User
+from .authentication import IntrospectionClientAuthentication, TokenUser, load_user
+from .availability import is_taken
+from .introspection import introspect
+from .keyring import get_keyring
+from .models import EmailOutbox, User
+from .pagination import KeysetCursorPagination
+from .permissions import IsModeratorOrAdmin
+from .pictures import ProfilePictureUploadHandler
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
     UserProfileSerializer,
+    UserDirectorySerializer,
+    AvailabilitySerializer,
     PasswordChangeSerializer,
     ForgotPasswordSerializer,
-    ResetPasswordSerializer
+    ResetPasswordSerializer,
+    TokenIntrospectionSerializer,
+    UserTokenRefreshSerializer
 )
+from .throttling import (
+    LOGIN_THROTTLES,
+    PASSWORD_RESET_THROTTLES,
+    AvailabilityIPThrottle,
+    lockout,
+    lockout_ident
+)
+from .tokens import UserRefreshToken
+from .utils import get_client_ip, profile_preconditions, set_profile_validators
 
 logger = logging.getLogger(__name__)
 
-
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+BOOLEAN_FIELD = serializers.BooleanField()
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -62,15 +79,13 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         
         if serializer.is_valid():
-            user = serializer.save()
+            # The login IP goes into the same INSERT as the user
+            user = serializer.save(last_login_ip=get_client_ip(request))
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             access_token = refresh.access_token
             
-            # Update last login IP
-            user.update_last_login_ip(get_client_ip(request))
-            
             logger.info(f"New user registered: {user.email}")
             
             return Response({
@@ -91,12 +106,45 @@ class UserRegistrationView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AvailabilityView(APIView):
+    """
+    Availability API
+    Tells the registration form whether an email or username is still free,
+    answering most lookups from memory
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [AvailabilityIPThrottle]
+
+    @extend_schema(
+        summary="Check Availability",
+        description="Check whether an email and/or username can still be registered",
+        parameters=[AvailabilitySerializer],
+        responses={
+            200: OpenApiResponse(description="Availability per checked field"),
+            400: OpenApiResponse(description="Validation errors"),
+            429: OpenApiResponse(description="Too many checks"),
+        }
+    )
+    def get(self, request):
+        serializer = AvailabilitySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        return Response({
+            'available': {
+                field: not is_taken(field, value)
+                for field, value in serializer.validated_data.items()
+            }
+        })
+
+
 class UserLoginView(APIView):
     """
     User Login API
     Authenticates user and returns JWT tokens
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = LOGIN_THROTTLES
 
     @extend_schema(
         summary="User Login",
@@ -105,6 +153,7 @@ class UserLoginView(APIView):
         responses={
             200: OpenApiResponse(description="Login successful"),
             400: OpenApiResponse(description="Invalid credentials"),
+            429: OpenApiResponse(description="Too many attempts"),
         }
     )
     def post(self, request):
@@ -112,17 +161,20 @@ class UserLoginView(APIView):
             data=request.data,
             context={'request': request}
         )
+        lockout_key = lockout_ident(request)
         
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
+            if lockout_key:
+                lockout.reset(lockout_key)
+            
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             access_token = refresh.access_token
             
-            # Update last login info
-            login(request, user)
-            user.update_last_login_ip(get_client_ip(request))
+            # Record last login info (no session, single UPDATE)
+            user.record_login(get_client_ip(request))
             
             logger.info(f"User logged in: {user.email}")
             
@@ -142,6 +194,9 @@ class UserLoginView(APIView):
                 }
             }, status=status.HTTP_200_OK)
         
+        if lockout_key:
+            lockout.record_failure(lockout_key)
+        
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -164,7 +219,7 @@ class UserLogoutView(APIView):
         try:
             refresh_token = request.data.get("refresh_token")
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = UserRefreshToken(refresh_token)
                 token.blacklist()
             
             logger.info(f"User logged out: {request.user.email}")
@@ -185,15 +240,72 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    user = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Ahead of Django's handlers, so oversized pictures are refused
+        # before they are buffered
+        request.upload_handlers.insert(0, ProfilePictureUploadHandler(request))
 
     def get_object(self):
-        return self.request.user
+        """Current user, resolved through the user cache once per request"""
+        if self.user is None:
+            user = self.request.user
+            if isinstance(user, TokenUser):
+                user = load_user(user.pk)
+            self.user = user
+        return self.user
+
+    def retrieve(self, request, *args, **kwargs):
+        """Answer 304 without serializing when the client's copy is current"""
+        user = self.get_object()
+        response = profile_preconditions(request, user)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return set_profile_validators(response, user)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Parse, validate and store any picture without holding a lock, then
+        apply If-Match/If-Unmodified-Since to the locked row, so concurrent
+        writers holding the same ETag cannot both succeed. Under the lock
+        only the changed columns are written.
+        """
+        self.user = generics.get_object_or_404(User, pk=request.user.pk)
+        response = profile_preconditions(request, self.user)
+        if response is not None:
+            return response
+
+        serializer = self.get_serializer(
+            self.user,
+            data=request.data,
+            partial=kwargs.pop('partial', False)
+        )
+        serializer.is_valid(raise_exception=True)
+        stored = serializer.store_picture()
+
+        with transaction.atomic():
+            self.user = generics.get_object_or_404(
+                User.objects.select_for_update(),
+                pk=request.user.pk
+            )
+            response = profile_preconditions(request, self.user)
+            if response is not None:
+                return response
+            serializer.instance = self.user
+            serializer.save(**stored)
+        return set_profile_validators(Response(serializer.data), self.user)
 
     @extend_schema(
         summary="Get User Profile",
-        description="Retrieve current user's profile information",
+        description=(
+            "Retrieve current user's profile information. Send the returned "
+            "ETag as If-None-Match to get 304 while the profile is unchanged."
+        ),
         responses={
             200: UserProfileSerializer,
+            304: OpenApiResponse(description="Profile unchanged"),
         }
     )
     def get(self, request, *args, **kwargs):
@@ -201,10 +313,14 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
     @extend_schema(
         summary="Update User Profile",
-        description="Update current user's profile information",
+        description=(
+            "Update current user's profile information. Send the profile's ETag as If-Match "
+            "to reject the write if the profile changed since it was read."
+        ),
         responses={
             200: UserProfileSerializer,
             400: OpenApiResponse(description="Validation errors"),
+            412: OpenApiResponse(description="Profile changed since it was read"),
         }
     )
     def put(self, request, *args, **kwargs):
@@ -212,16 +328,112 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
     @extend_schema(
         summary="Partial Update User Profile",
-        description="Partially update current user's profile information",
+        description=(
+            "Partially update current user's profile information. Send the profile's ETag as If-Match "
+            "to reject the write if the profile changed since it was read."
+        ),
         responses={
             200: UserProfileSerializer,
             400: OpenApiResponse(description="Validation errors"),
+            412: OpenApiResponse(description="Profile changed since it was read"),
         }
     )
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)
 
 
+class UserDirectoryView(generics.ListAPIView):
+    """
+    User Directory API
+    Newest-first user list for moderators and admins, paginated by a
+    (created_at, id) cursor so any page costs the same
+    """
+    serializer_class = UserDirectorySerializer
+    permission_classes = [IsModeratorOrAdmin]
+    pagination_class = KeysetCursorPagination
+
+    @cached_property
+    def requested_fields(self):
+        """Fields named by ?fields=, or None for all of them"""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = set(fields) - set(UserDirectorySerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({
+                'fields': [f"Unknown field(s): {', '.join(sorted(unknown))}."]
+            })
+        return fields
+
+    def get_queryset(self):
+        queryset = User.objects.all()
+        if self.requested_fields is not None:
+            # The cursor needs created_at and id whatever is displayed
+            queryset = queryset.only(
+                'id',
+                'created_at',
+                *UserDirectorySerializer.columns(self.requested_fields)
+            )
+        return queryset
+
+    def filter_queryset(self, queryset):
+        params = self.request.query_params
+
+        role = params.get('role')
+        if role:
+            if role not in User.Role.values:
+                raise ValidationError({
+                    'role': [f"Must be one of: {', '.join(User.Role.values)}."]
+                })
+            queryset = queryset.filter(role=role)
+
+        for name in ('is_active', 'is_verified'):
+            value = params.get(name)
+            if value is None:
+                continue
+            try:
+                queryset = queryset.filter(**{name: BOOLEAN_FIELD.to_internal_value(value)})
+            except ValidationError as e:
+                raise ValidationError({name: e.detail})
+
+        # Prefix matches can use the pattern indexes; substring matches can't
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(
+                Q(email__istartswith=search)
+                | Q(username__istartswith=search)
+                | Q(first_name__istartswith=search)
+                | Q(last_name__istartswith=search)
+            )
+
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(
+        summary="List Users",
+        description="Cursor-paginated user directory (moderators and admins)",
+        parameters=[
+            OpenApiParameter('fields', str, description="Comma-separated fields to return"),
+            OpenApiParameter('role', str, enum=User.Role.values),
+            OpenApiParameter('is_active', bool),
+            OpenApiParameter('is_verified', bool),
+            OpenApiParameter('search', str, description="Email, username or name prefix"),
+        ],
+        responses={
+            200: UserDirectorySerializer(many=True),
+            400: OpenApiResponse(description="Invalid filter or field"),
+            403: OpenApiResponse(description="Not a moderator or admin"),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
 class PasswordChangeView(APIView):
     """
     Password Change API
@@ -234,7 +446,7 @@ class PasswordChangeView(APIView):
         description="Change user's password",
         request=PasswordChangeSerializer,
         responses={
-            200: OpenApiResponse(description="Password changed successfully"),
+            200: OpenApiResponse(description="Password changed; new tokens issued"),
             400: OpenApiResponse(description="Validation errors"),
         }
     )
@@ -245,12 +457,19 @@ class PasswordChangeView(APIView):
         )
         
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            
+            # Other sessions were revoked; keep this one signed in
+            refresh = UserRefreshToken.for_user(user)
             
             logger.info(f"Password changed for user: {request.user.email}")
             
             return Response({
-                'message': 'Password changed successfully'
+                'message': 'Password changed successfully',
+                'tokens': {
+                    'access': str(refresh.access_token),
+                    'refresh': str(refresh),
+                }
             }, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -259,9 +478,10 @@ class PasswordChangeView(APIView):
 class ForgotPasswordView(APIView):
     """
     Forgot Password API
-    Send password reset email to user
+    Queue password reset email for the outbox worker
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = PASSWORD_RESET_THROTTLES
 
     @extend_schema(
         summary="Forgot Password",
@@ -270,6 +490,7 @@ class ForgotPasswordView(APIView):
         responses={
             200: OpenApiResponse(description="Reset email sent"),
             400: OpenApiResponse(description="Validation errors"),
+            429: OpenApiResponse(description="Too many requests"),
         }
     )
     def post(self, request):
@@ -279,7 +500,7 @@ class ForgotPasswordView(APIView):
             email = serializer.validated_data['email']
             
             try:
-                user = User.objects.get(email=email)
+                user = User.objects.get(email__lower=email.lower())
                 
                 # Generate password reset token
                 token = default_token_generator.make_token(user)
@@ -288,7 +509,7 @@ class ForgotPasswordView(APIView):
                 # Create reset link
                 reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
                 
-                # Send email
+                # Queue email (delivered by the send_outbox command)
                 subject = 'Password Reset Request'
                 message = f"""
                 Hi {user.get_full_name()},
@@ -304,15 +525,14 @@ class ForgotPasswordView(APIView):
                 JWT Auth Team
                 """
                 
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [email],
-                    fail_silently=False,
+                EmailOutbox.objects.create(
+                    subject=subject,
+                    body=message,
+                    from_email=settings.EMAIL_HOST_USER,
+                    to_email=email,
                 )
                 
-                logger.info(f"Password reset email sent to: {email}")
+                logger.info(f"Password reset email queued for: {email}")
                 
             except User.DoesNotExist:
                 # Don't reveal if email exists for security
@@ -359,6 +579,7 @@ class ResetPasswordView(APIView):
                     # Reset password
                     user.set_password(serializer.validated_data['new_password'])
                     user.save()
+                    user.revoke_tokens()
                     
                     logger.info(f"Password reset successful for user: {user.email}")
                     
@@ -383,6 +604,8 @@ class CustomTokenRefreshView(TokenRefreshView):
     """
     Custom JWT Token Refresh View with logging
     """
+    serializer_class = UserTokenRefreshSerializer
+
     @extend_schema(
         summary="Refresh JWT Token",
         description="Refresh access token using refresh token",
@@ -394,6 +617,54 @@ class CustomTokenRefreshView(TokenRefreshView):
         return response
 
 
+class TokenIntrospectionView(APIView):
+    """
+    Token Introspection API
+    RFC 7662-style introspection for resource servers, single or batched
+    """
+    authentication_classes = [IntrospectionClientAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Introspect Tokens",
+        description=(
+            "Report whether access or refresh tokens are active and which user "
+            "and role they carry. Send `token` for a single RFC 7662 response "
+            "or `tokens` for a batch answered in request order. Requires HTTP "
+            "Basic client credentials."
+        ),
+        request=TokenIntrospectionSerializer,
+        responses={
+            200: OpenApiResponse(description="Introspection result(s)"),
+            400: OpenApiResponse(description="Validation errors"),
+            401: OpenApiResponse(description="Invalid client credentials"),
+        }
+    )
+    def post(self, request):
+        serializer = TokenIntrospectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        raw_tokens = data.get('tokens') or [data['token']]
+        results, max_age = introspect(raw_tokens, data.get('token_type_hint'))
+
+        if 'tokens' in data:
+            response = Response({'results': results}, status=status.HTTP_200_OK)
+        else:
+            response = Response(results[0], status=status.HTTP_200_OK)
+
+        # Active results may be reused until the earliest expiry, capped so
+        # revocations reach callers quickly; inactive ones never change
+        if max_age is None:
+            max_age = settings.INTROSPECTION_MAX_AGE
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=min(max_age, settings.INTROSPECTION_MAX_AGE)
+        )
+        return response
+
+
 # Health check endpoint
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -409,4 +680,21 @@ def health_check(request):
     return Response({
         'status': 'healthy',
         'message': 'JWT Auth API is running'
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }, status=status.HTTP_200_OK)
+
+
+# Public signing keys
+@require_GET
+def jwks(request):
+    """
+    JSON Web Key Set of the token signing keys, so other services can verify
+    tokens locally
+    """
+    keyring = get_keyring()
+    etag = quote_etag(keyring.etag)
+
+    response = HttpResponse(keyring.jwks, content_type='application/json')
+    response['ETag'] = etag
+    response = get_conditional_response(request, etag=etag, response=response)
+    patch_cache_control(response, public=True, max_age=settings.JWKS_MAX_AGE)
+    return response
@@ -240,7 +240,14 @@ export const AuthProvider = ({ children }) => {
   // Change password function
   const changePassword = async (passwordData) => {
     try {
-      await authAPI.changePassword(passwordData);
+      const response = await authAPI.changePassword(passwordData);
+      
+      // Other sessions are revoked; switch to the freshly issued tokens
+      const { tokens } = response.data;
+      if (tokens) {
+        TokenManager.setTokens(tokens.access, tokens.refresh);
+      }
+      
       return { success: true, message: 'Password changed successfully' };
       
     } catch (error) {